@@ -0,0 +1,199 @@
+"""
+Length-bucketed batching under a token budget for model.encode.
+
+Every sequence in a batch is padded to the longest one, so batching a
+200-byte README with a 60 KB one spends most of the compute on padding.
+Documents are pre-tokenized, sorted by token length, and cut into batches
+whose padded size (longest length x batch size) stays within a token budget.
+Embeddings come back in the original order, and a BudgetController
+picks the budget from free memory and adapts it to out-of-memory failures.
+"""
+
+import numpy as np
+import os
+import sys
+
+# Unset means probe free memory for a starting budget
+TOKEN_BUDGET = int(os.environ["INGEST_TOKEN_BUDGET"]) if os.environ.get("INGEST_TOKEN_BUDGET") else None
+
+
+def token_lengths(model, texts: list[str]) -> list[int]:
+    """Token counts as the model will see them, truncated to its max_seq_length"""
+    max_length = model.max_seq_length
+    encoded = model.tokenizer(
+        texts,
+        add_special_tokens=True,
+        truncation=True,
+        max_length=max_length,
+        return_attention_mask=False,
+        return_token_type_ids=False
+    )
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+def token_batches(lengths: list[int], budget: int) -> list[list[int]]:
+    """
+    Indices of lengths grouped shortest-first into batches whose padded size
+    fits the budget. A document longer than the budget gets a batch of its own.
+    """
+    batches = []
+    batch = []
+    for idx in np.argsort(lengths, kind="stable"):
+        # Sorted ascending, so the newest item is the longest in the batch
+        if batch and lengths[idx] * (len(batch) + 1) > budget:
+            batches.append(batch)
+            batch = []
+        batch.append(int(idx))
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def padded_tokens(lengths: list[int], batches: list[list[int]]) -> int:
+    """Size of the padded token grid the batches will run"""
+    return sum(max(lengths[i] for i in b) * len(b) for b in batches)
+
+
+def is_oom(e: BaseException) -> bool:
+    text = str(e).lower()
+    return "out of memory" in text or "can't allocate memory" in text or type(e).__name__ == "OutOfMemoryError"
+
+
+class BudgetController:
+    """
+    Finds and keeps the largest token budget that fits in memory.
+
+    The starting budget comes from probing free device (or host) memory. After
+    GROW_AFTER clean batches the budget grows, and an out-of-memory failure
+    shrinks it. Both moves bisect between the largest budget that worked and
+    the smallest that failed, so it settles instead of oscillating.
+    """
+
+    GROW_AFTER = 10
+    FLOOR = 256
+
+    def __init__(self, budget: int | None = TOKEN_BUDGET, ceiling: int = 1 << 20):
+        self.ceiling = ceiling
+        self.good = 0
+        self.bad = None
+        self.streak = 0
+        self.budget = budget or self.probe()
+        self.log(f"starting token budget {self.budget}")
+
+    def log(self, message: str):
+        print(f"\n*** {message}", file=sys.stderr, flush=True)
+
+    def probe(self) -> int:
+        """Half of the free memory divided by the per-token activation cost"""
+        try:
+            import torch
+            if torch.cuda.is_available():
+                free, _ = torch.cuda.mem_get_info()
+                where = "cuda"
+            else:
+                free = _host_available()
+                where = "host"
+        except Exception:
+            free = _host_available()
+            where = "host"
+        budget = int(free * 0.5 / BYTES_PER_TOKEN)
+        self.log(f"{free / 2**30:.1f} GiB free on {where}")
+        return max(self.FLOOR, min(self.ceiling, budget))
+
+    def succeeded(self):
+        self.good = max(self.good, self.budget)
+        self.streak += 1
+        if self.streak < self.GROW_AFTER:
+            return
+        self.streak = 0
+        target = (self.budget + self.bad) // 2 if self.bad else self.budget * 2
+        target = min(self.ceiling, target)
+        if target > self.budget:
+            self.log(f"token budget {self.budget} -> {target} after {self.GROW_AFTER} clean batches")
+            self.budget = target
+
+    def failed(self, padded: int):
+        """Record an out-of-memory failure of a batch of padded tokens"""
+        self.streak = 0
+        self.bad = min(self.bad or padded, padded)
+        if self.good and self.good >= self.bad:
+            # Memory got tighter since that budget worked
+            self.good = 0
+        target = (self.good + self.bad) // 2 if self.good else self.bad // 2
+        target = max(self.FLOOR, min(self.budget, target))
+        self.log(f"out of memory at {padded} tokens, token budget {self.budget} -> {target}")
+        self.budget = target
+
+
+BYTES_PER_TOKEN = int(os.environ.get("INGEST_BYTES_PER_TOKEN", 256 * 1024))
+
+
+def _host_available() -> int:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+
+
+def _free_cache():
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except Exception:
+        pass
+
+
+def encode_bucketed(model, texts: list[str], controller: BudgetController, lengths: list[int] | None = None, **kwargs) -> tuple[np.ndarray, list[int]]:
+    """
+    model.encode over length-bucketed batches, returned in the order of texts.
+
+    A batch that runs out of memory is split in half and both halves are
+    retried, so nothing is dropped. Only a single document that does not fit
+    on its own fails; its index is returned in the failed list and its row is NaN.
+    """
+    if lengths is None:
+        lengths = token_lengths(model, texts)
+    out = None
+    failed = []
+    pending = list(reversed(token_batches(lengths, controller.budget)))
+    while pending:
+        batch = pending.pop()
+        padded = max(lengths[i] for i in batch) * len(batch)
+        if padded > controller.budget and len(batch) > 1:
+            # The budget shrank after this batch was formed
+            half = len(batch) // 2
+            pending += [batch[half:], batch[:half]]
+            continue
+        try:
+            embeddings = model.encode(
+                [texts[i] for i in batch],
+                batch_size=len(batch),
+                show_progress_bar=False,
+                convert_to_numpy=True,
+                **kwargs
+            )
+        except RuntimeError as e:
+            if not is_oom(e):
+                raise
+            _free_cache()
+            controller.failed(padded)
+            if len(batch) == 1:
+                controller.log(f"document of {padded} tokens does not fit, skipping it")
+                failed.append(batch[0])
+            else:
+                half = len(batch) // 2
+                pending += [batch[half:], batch[:half]]
+            continue
+
+        controller.succeeded()
+        if out is None:
+            out = np.full((len(texts), embeddings.shape[1]), np.nan, dtype=np.float32)
+        out[batch] = embeddings
+    if out is None:
+        out = np.full((len(texts), 0), np.nan, dtype=np.float32)
+    return out, failed
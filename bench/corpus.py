@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Synthetic gh/-shaped corpus: gh/<owner>/<repo>/ with a README.md and the
+_one-liner.json, _mcp-config.json and _meta-info.json sidecars, in the same
+shapes oneliner, server-config and gh-get-meta write them.
+
+  bench/corpus.py OUT_DIR [--repos 500] [--seed 0]
+"""
+
+from pathlib import Path
+import argparse
+import json
+import random
+
+TOPICS = [
+    "web search", "github issues", "postgres database", "file system", "slack messages",
+    "browser automation", "weather forecast", "vector store", "kubernetes cluster", "email inbox",
+    "calendar events", "jira tickets", "spotify playback", "notion pages", "stock prices"
+]
+WORDS = "the server exposes tools to query list create update delete fetch and search resources over mcp".split()
+
+
+def readme(rng: random.Random, name: str, topic: str) -> str:
+    # Lengths spread over two orders of magnitude, like real READMEs
+    paragraphs = rng.choice([1, 2, 4, 8, 16, 64])
+    body = "\n\n".join(
+        " ".join(rng.choice(WORDS + topic.split()) for _ in range(rng.randint(20, 80)))
+        for _ in range(paragraphs)
+    )
+    return f"# {name}\n\nAn MCP server for {topic}.\n\n## Usage\n\n{body}\n"
+
+
+def make_repo(root: Path, rng: random.Random, i: int):
+    topic = rng.choice(TOPICS)
+    owner = f"owner{i % 97}"
+    name = f"{topic.replace(' ', '-')}-mcp-{i}"
+    base = root / "gh" / owner / name
+    base.mkdir(parents=True, exist_ok=True)
+
+    requires = [f"{topic.split()[0].upper()}_API_KEY"] if rng.random() < 0.4 else []
+    if rng.random() < 0.7:
+        one_liner = ["npx", "-y", f"@{owner}/{name}@1.{i % 10}.0"]
+    else:
+        one_liner = ["uvx", f"{name}=={i % 5}.1.0"]
+
+    (base / "README.md").write_text(readme(rng, name, topic))
+    (base / "_one-liner.json").write_text(json.dumps({"one_liner": one_liner, "requires": requires}))
+    (base / "_mcp-config.json").write_text(json.dumps({
+        "mcpServers": {name: {"command": one_liner[0], "args": one_liner[1:], "env": {r: "" for r in requires}}}
+    }, indent=2))
+    (base / "_meta-info.json").write_text(json.dumps({
+        "archivedAt": "2024-01-01T00:00:00Z" if rng.random() < 0.05 else None,
+        "forkCount": rng.randint(0, 200),
+        "pushedAt": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00Z",
+        "stargazerCount": int(rng.paretovariate(1.2) * 5),
+        "watchers": {"totalCount": rng.randint(0, 50)}
+    }))
+
+
+def generate(root, repos: int = 500, seed: int = 0) -> list[Path]:
+    """Write the corpus under root and return the README paths"""
+    root = Path(root)
+    rng = random.Random(seed)
+    for i in range(repos):
+        make_repo(root, rng, i)
+    return sorted(root.glob("gh/*/*/README.md"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("out")
+    parser.add_argument("--repos", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(f"{len(generate(args.out, args.repos, args.seed))} repos in {args.out}/gh")
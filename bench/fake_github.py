@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Stand-in GitHub API for exercising harvest_meta.py offline. Serves
+GET /repos/{owner}/{name} with ETags and 304s and POST /graphql for the
+aliased repository() batches harvest_meta sends, with rate limit headers,
+an optional per-request delay and per-kind request counts. Repo names
+starting with "missing" are not found, and every metadata value is derived
+from the name, plus `epoch` stars on a tenth of repos so a bump looks like
+some of them changed.
+
+  bench/fake_github.py [--port 8765] [--latency 0.05]
+
+  GITHUB_API_URL=http://127.0.0.1:8765 GITHUB_TOKEN=x ./harvest_meta.py
+"""
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from collections import Counter
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+
+RATE_LIMIT = 5000
+
+
+def repo_meta(owner: str, name: str, epoch: int = 0) -> dict | None:
+    if name.startswith("missing"):
+        return None
+    seed = int(hashlib.sha256(f"{owner}/{name}".encode()).hexdigest(), 16)
+    return {
+        "archivedAt": "2024-01-01T00:00:00Z" if seed % 20 == 0 else None,
+        "forkCount": seed % 200,
+        "pushedAt": f"2025-{seed % 12 + 1:02d}-{seed % 28 + 1:02d}T12:00:00Z",
+        "stargazerCount": seed % 5000 + (epoch if seed % 10 == 0 else 0),
+        "watchers": {"totalCount": seed % 50}
+    }
+
+
+def rest_repo(owner: str, name: str, meta: dict) -> dict:
+    return {
+        "full_name": f"{owner}/{name}",
+        "archived": meta["archivedAt"] is not None,
+        "updated_at": meta["archivedAt"] or meta["pushedAt"],
+        "forks_count": meta["forkCount"],
+        "pushed_at": meta["pushedAt"],
+        "stargazers_count": meta["stargazerCount"],
+        "subscribers_count": meta["watchers"]["totalCount"]
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def send(self, status: int, body: bytes = b"", headers: dict | None = None):
+        server = self.server
+        with server.lock:
+            if status != 304:
+                server.remaining = max(server.remaining - 1, 0)
+            remaining = server.remaining
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("x-ratelimit-limit", str(RATE_LIMIT))
+        self.send_header("x-ratelimit-remaining", str(remaining))
+        self.send_header("x-ratelimit-reset", str(int(time.time()) + 3600))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.wait()
+        match = re.match(r"^/repos/([^/]+)/([^/?]+)$", self.path)
+        if not match:
+            return self.send(404, b'{"message":"Not Found"}')
+        meta = repo_meta(*match.groups(), self.server.epoch)
+        if meta is None:
+            self.server.count("rest_404")
+            return self.send(404, b'{"message":"Not Found"}')
+        body = json.dumps(rest_repo(*match.groups(), meta)).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count("rest_304")
+            return self.send(304, headers={"ETag": etag})
+        self.server.count("rest_200")
+        self.send(200, body, {"ETag": etag})
+
+    def do_POST(self):
+        self.server.wait()
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if self.path != "/graphql":
+            return self.send(404, b'{"message":"Not Found"}')
+        if not self.headers.get("Authorization"):
+            return self.send(401, b'{"message":"Requires authentication"}')
+        self.server.count("graphql")
+        variables = request.get("variables") or {}
+        data, errors = {}, []
+        for alias, i in re.findall(r"(\w+): repository\(owner: \$o(\d+)", request.get("query", "")):
+            meta = repo_meta(variables[f"o{i}"], variables[f"n{i}"], self.server.epoch)
+            data[alias] = meta
+            if meta is None:
+                errors.append({"type": "NOT_FOUND", "path": [alias], "message": "Could not resolve to a Repository"})
+        body = {"data": data, **({"errors": errors} if errors else {})}
+        self.send(200, json.dumps(body).encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeGitHub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0):
+        super().__init__(address, Handler)
+        self.latency = latency
+        self.epoch = 0
+        self.remaining = RATE_LIMIT
+        self.requests = Counter()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def count(self, kind: str):
+        with self.lock:
+            self.requests[kind] += 1
+
+
+def serve(port: int = 0, latency: float = 0.0) -> FakeGitHub:
+    """Start the API on a background thread; the bound port is server.server_port"""
+    server = FakeGitHub(("127.0.0.1", port), latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    args = parser.parse_args()
+    server = FakeGitHub(("127.0.0.1", args.port), args.latency)
+    print(f"GitHub API at http://127.0.0.1:{args.port}")
+    server.serve_forever()
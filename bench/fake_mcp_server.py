@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Minimal stdio MCP server for benchmarks, speaking newline-delimited JSON-RPC
+with no dependencies so its own startup cost stays negligible.
+
+  bench/fake_mcp_server.py [--tools 20] [--startup-delay 0]
+
+Tools:
+  echo    returns its arguments as text
+  sleep   waits `seconds`, then returns; reports progress when asked to
+  blob    returns `size` bytes of text
+  tool_N  padding tools with schemas, so tools/list has a realistic size
+"""
+
+import argparse
+import json
+import sys
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--tools", type=int, default=20)
+parser.add_argument("--startup-delay", type=float, default=0.0, help="simulate an npx/uvx cold start")
+args = parser.parse_args()
+
+TOOLS = [
+    {"name": "echo", "description": "Echo the arguments back", "inputSchema": {"type": "object", "properties": {"text": {"type": "string"}}}},
+    {"name": "sleep", "description": "Sleep for a number of seconds", "inputSchema": {"type": "object", "properties": {"seconds": {"type": "number"}}}},
+    {"name": "blob", "description": "Return size bytes of text", "inputSchema": {"type": "object", "properties": {"size": {"type": "integer"}}}},
+] + [
+    {
+        "name": f"tool_{i}",
+        "description": f"Padding tool number {i} that does nothing useful",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "What to look up"},
+                "limit": {"type": "integer", "default": 10},
+                "options": {"$ref": "#/$defs/Options"}
+            },
+            "required": ["query"],
+            "$defs": {"Options": {"type": "object", "properties": {"verbose": {"type": "boolean"}, "format": {"type": "string", "enum": ["json", "text"]}}}}
+        }
+    }
+    for i in range(args.tools)
+]
+
+
+def send(message: dict):
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def call(name: str, arguments: dict, progress_token=None) -> dict:
+    if name == "echo":
+        text = json.dumps(arguments)
+    elif name == "sleep":
+        steps = 4
+        for step in range(1, steps + 1):
+            time.sleep(float(arguments.get("seconds", 0)) / steps)
+            if progress_token is not None:
+                send({"jsonrpc": "2.0", "method": "notifications/progress", "params": {
+                    "progressToken": progress_token, "progress": step, "total": steps
+                }})
+        text = "done"
+    elif name == "blob":
+        text = "x" * int(arguments.get("size", 1024))
+    elif any(t["name"] == name for t in TOOLS):
+        text = "ok"
+    else:
+        return {"content": [{"type": "text", "text": f"Unknown tool: {name}"}], "isError": True}
+    return {"content": [{"type": "text", "text": text}], "isError": False}
+
+
+def handle(message: dict):
+    method = message.get("method")
+    params = message.get("params") or {}
+    if method == "initialize":
+        return {
+            "protocolVersion": params.get("protocolVersion", "2024-11-05"),
+            "capabilities": {"tools": {}},
+            "serverInfo": {"name": "fake-mcp", "version": "0.0.1"}
+        }
+    if method == "ping":
+        return {}
+    if method == "tools/list":
+        return {"tools": TOOLS}
+    if method == "tools/call":
+        return call(params["name"], params.get("arguments") or {}, (params.get("_meta") or {}).get("progressToken"))
+    raise LookupError(method)
+
+
+time.sleep(args.startup_delay)
+for line in sys.stdin:
+    if not line.strip():
+        continue
+    message = json.loads(line)
+    if "id" not in message:
+        continue  # notification
+    try:
+        reply = {"jsonrpc": "2.0", "id": message["id"], "result": handle(message)}
+    except LookupError as e:
+        reply = {"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32601, "message": f"Method not found: {e}"}}
+    send(reply)
@@ -0,0 +1,50 @@
+"""
+Tiny stand-in for the SentenceTransformer embedding model.
+
+Embeddings are hashed bags of words, so they are deterministic, cheap, and
+similar texts still land near each other. Load it with
+
+    EMBED_MODEL=fake_model:FakeModel   (with bench/ on PYTHONPATH)
+"""
+
+import numpy as np
+import re
+import zlib
+
+WORD_RE = re.compile(r"\w+")
+
+
+class FakeTokenizer:
+    def __call__(self, texts, add_special_tokens=True, truncation=True, max_length=512, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        ids = []
+        for text in texts:
+            tokens = [zlib.crc32(w.encode()) % 30000 for w in WORD_RE.findall(text.lower())]
+            if add_special_tokens:
+                tokens = [1] + tokens + [2]
+            ids.append(tokens[:max_length] if truncation else tokens)
+        return {"input_ids": ids}
+
+
+class FakeModel:
+    def __init__(self, dims: int = 64, max_seq_length: int = 512):
+        self.dims = dims
+        self.max_seq_length = max_seq_length
+        self.tokenizer = FakeTokenizer()
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dims
+
+    def to(self, device):
+        return self
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = False, convert_to_numpy: bool = True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        out = np.zeros((len(texts), self.dims), dtype=np.float32)
+        for row, ids in enumerate(self.tokenizer(texts, max_length=self.max_seq_length)["input_ids"]):
+            for token in ids:
+                out[row, token % self.dims] += 1.0 if token & 1 else -1.0
+        out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out[0] if single else out
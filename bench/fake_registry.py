@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Stand-in npm registry and PyPI simple index for exercising pkgstore.py
+offline. Every package name resolves to a package wrapping
+bench/fake_mcp_server.py, published at versions 0.0.0 through 9.9.0, so the
+one_liners bench/corpus.py writes all install.
+
+  bench/fake_registry.py [--port 4873]
+
+  INFINITEMCP_NPM_REGISTRY=http://127.0.0.1:4873/npm/
+  INFINITEMCP_PYPI_INDEX=http://127.0.0.1:4873/simple/
+"""
+
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import unquote
+import argparse
+import base64
+import hashlib
+import io
+import json
+import re
+import tarfile
+import threading
+import zipfile
+
+SERVER_SOURCE = (Path(__file__).resolve().parent / "fake_mcp_server.py").read_text()
+VERSIONS = [f"{major}.{minor}.0" for major in range(10) for minor in range(10)]
+
+
+def short_name(name: str) -> str:
+    return name.split("/")[-1]
+
+
+def _add(tar: tarfile.TarFile, path: str, data: bytes, mode: int = 0o644):
+    info = tarfile.TarInfo(path)
+    info.size = len(data)
+    info.mode = mode
+    tar.addfile(info, io.BytesIO(data))
+
+
+@lru_cache(maxsize=256)
+def npm_tarball(name: str, version: str) -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        manifest = {"name": name, "version": version, "bin": {short_name(name): "server.py"}}
+        _add(tar, "package/package.json", json.dumps(manifest).encode())
+        _add(tar, "package/server.py", SERVER_SOURCE.encode(), 0o755)
+    return buf.getvalue()
+
+
+def packument(base: str, name: str) -> dict:
+    versions = {}
+    for version in VERSIONS:
+        data = npm_tarball(name, version)
+        versions[version] = {
+            "name": name,
+            "version": version,
+            "bin": {short_name(name): "server.py"},
+            "dist": {
+                "tarball": f"{base}/npm/{name}/-/{short_name(name)}-{version}.tgz",
+                "shasum": hashlib.sha1(data).hexdigest(),
+                "integrity": "sha512-" + base64.b64encode(hashlib.sha512(data).digest()).decode()
+            }
+        }
+    return {"name": name, "dist-tags": {"latest": VERSIONS[-1]}, "versions": versions}
+
+
+def normalize(name: str) -> str:
+    return re.sub(r"[-_.]+", "_", name).lower()
+
+
+@lru_cache(maxsize=256)
+def wheel(name: str, version: str) -> bytes:
+    module = normalize(name)
+    dist_info = f"{module}-{version}.dist-info"
+    files = {
+        f"{module}/__init__.py": (
+            f"SOURCE = {SERVER_SOURCE!r}\n\n"
+            "def main():\n"
+            "    exec(compile(SOURCE, 'fake_mcp_server', 'exec'), {'__name__': '__main__'})\n"
+        ),
+        f"{dist_info}/METADATA": f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n",
+        f"{dist_info}/WHEEL": "Wheel-Version: 1.0\nGenerator: fake_registry\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+        f"{dist_info}/entry_points.txt": f"[console_scripts]\n{name} = {module}:main\n"
+    }
+    record = []
+    for path, text in files.items():
+        digest = base64.urlsafe_b64encode(hashlib.sha256(text.encode()).digest()).rstrip(b"=").decode()
+        record.append(f"{path},sha256={digest},{len(text.encode())}")
+    record.append(f"{dist_info}/RECORD,,")
+    files[f"{dist_info}/RECORD"] = "\n".join(record) + "\n"
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for path, text in files.items():
+            zf.writestr(path, text)
+    return buf.getvalue()
+
+
+def simple_page(name: str) -> str:
+    links = []
+    for version in VERSIONS:
+        filename = f"{normalize(name)}-{version}-py3-none-any.whl"
+        digest = hashlib.sha256(wheel(name, version)).hexdigest()
+        links.append(f'<a href="/files/{name}/{filename}#sha256={digest}">{filename}</a><br>')
+    return "<!DOCTYPE html><html><body>\n" + "\n".join(links) + "\n</body></html>\n"
+
+
+class Handler(BaseHTTPRequestHandler):
+    def send(self, body: bytes, content_type: str, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = unquote(self.path.split("?")[0])
+        base = f"http://{self.headers.get('Host')}"
+        if match := re.match(r"^/npm/(.+)/-/[^/]+-(\d+\.\d+\.\d+)\.tgz$", path):
+            return self.send(npm_tarball(match.group(1), match.group(2)), "application/octet-stream")
+        if match := re.match(r"^/npm/(.+?)/?$", path):
+            return self.send(json.dumps(packument(base, match.group(1))).encode(), "application/json")
+        if match := re.match(r"^/simple/([^/]+)/?$", path):
+            return self.send(simple_page(match.group(1)).encode(), "text/html")
+        if match := re.match(r"^/files/([^/]+)/[^/]+-(\d+\.\d+\.\d+)-py3-none-any\.whl$", path):
+            return self.send(wheel(match.group(1), match.group(2)), "application/octet-stream")
+        self.send(b"not found", "text/plain", 404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int = 0) -> ThreadingHTTPServer:
+    """Start the registry on a background thread; the bound port is server.server_port"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=4873)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+    print(f"npm registry at http://127.0.0.1:{args.port}/npm/, PyPI index at http://127.0.0.1:{args.port}/simple/")
+    server.serve_forever()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark harness. Everything runs against a synthetic corpus, the
+stand-in embedding model and a fake stdio MCP server, so no network, GPU or
+real index is needed.
+
+  bench/run.py [--only ingest,search,mcp,pkgstore,harvest] [--repos 500] [--out results.json]
+
+Measures
+  ingest  docs/s of insert_chroma.py and insert_qdrant.py over a generated gh/ tree
+  search  p50/p99 latency and QPS of query_chroma_server.py /search and /search/batch
+  mcp     spawn+initialize, list_tools and call_tool latency through mcp_pool
+  pkgstore  spawn+initialize of an npx one_liner, through npx and from pkgstore.py,
+            against bench/fake_registry.py (needs npm)
+  harvest  harvest_meta.py wall time and requests against bench/fake_github.py: one
+           repo per request (the old gh-get-meta loop, minus its sleep), GraphQL
+           batches, an ETag revalidation pass and a run with nothing stale
+
+and writes one JSON document, so runs can be diffed between releases.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH = Path(__file__).resolve().parent
+ROOT = BENCH.parent
+sys.path[:0] = [str(ROOT), str(BENCH)]
+
+import corpus  # noqa: E402
+
+
+def percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    pick = lambda p: ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+    return {
+        "n": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(pick(50), 3),
+        "p99_ms": round(pick(99), 3)
+    }
+
+
+def script_env() -> dict:
+    return {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join([str(ROOT), str(BENCH), os.environ.get("PYTHONPATH", "")]),
+        "EMBED_MODEL": "fake_model:FakeModel",
+        "INGEST_TOKEN_BUDGET": os.environ.get("INGEST_TOKEN_BUDGET", "65536")
+    }
+
+
+def bench_ingest(workdir: Path, readmes: list[Path]) -> dict:
+    paths = "".join(f"{p.relative_to(workdir)}\n" for p in readmes)
+    out = {}
+    for script in ("insert_chroma.py", "insert_qdrant.py"):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, str(ROOT / script)],
+            input=paths, text=True, cwd=workdir, env=script_env(),
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        elapsed = time.perf_counter() - start
+        out[script] = {
+            "ok": proc.returncode == 0,
+            "docs": len(readmes),
+            "seconds": round(elapsed, 3),
+            "docs_per_s": round(len(readmes) / elapsed, 1)
+        }
+        if proc.returncode != 0:
+            out[script]["error"] = proc.stderr.strip().splitlines()[-1:]
+    return out
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def bench_search(workdir: Path, requests: int, concurrency: int) -> dict:
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, str(ROOT / "query_chroma_server.py")],
+        cwd=workdir, env={**script_env(), "PORT": str(port), "SEARCH_DEBUG": "0"},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        with httpx.Client(base_url=base, timeout=30) as client:
+            started = time.perf_counter()
+            while True:
+                try:
+                    client.get("/health").raise_for_status()
+                    break
+                except httpx.HTTPError:
+                    if server.poll() is not None or time.perf_counter() - started > 60:
+                        return {"ok": False, "error": "server did not start"}
+                    time.sleep(0.1)
+            startup = time.perf_counter() - started
+
+            # Distinct queries so the embedding cache does not hide the encoder
+            queries = [f"{corpus.TOPICS[i % len(corpus.TOPICS)]} {i}" for i in range(requests)]
+            client.get("/search", params={"q": "warmup"})
+
+            def one(q):
+                t = time.perf_counter()
+                client.get("/search", params={"q": q}).raise_for_status()
+                return time.perf_counter() - t
+
+            result = {"ok": True, "startup_s": round(startup, 3)}
+            for c in sorted({1, concurrency}):
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=c) as pool:
+                    samples = list(pool.map(one, [f"{q} c{c}" for q in queries]))
+                wall = time.perf_counter() - start
+                result[f"concurrency_{c}"] = {**percentiles(samples), "qps": round(len(samples) / wall, 1)}
+
+            start = time.perf_counter()
+            for i in range(0, len(queries), 32):
+                client.post("/search/batch", json={"queries": [{"q": f"{q} batch"} for q in queries[i:i + 32]]}).raise_for_status()
+            result["batch_32"] = {"qps": round(len(queries) / (time.perf_counter() - start), 1)}
+            result["server_stats"] = client.get("/stats").json()
+            return result
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+async def bench_mcp(rounds: int) -> dict:
+    from mcp_pool import ServerPool
+
+    command = [sys.executable, str(BENCH / "fake_mcp_server.py"), "--tools", "40"]
+    spawn, listing, calls = [], [], []
+    for i in range(rounds):
+        pool = ServerPool(max_live=1)
+        try:
+            start = time.perf_counter()
+            await pool._acquire(command, {"ROUND": str(i)})
+            spawn.append(time.perf_counter() - start)
+
+            for _ in range(5):
+                start = time.perf_counter()
+                async with pool.session(command, {"ROUND": str(i)}) as session:
+                    await session.list_tools()
+                listing.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                async with pool.session(command, {"ROUND": str(i)}) as session:
+                    await session.call_tool("echo", {"text": "hello"})
+                calls.append(time.perf_counter() - start)
+        finally:
+            await pool.close_all()
+
+    return {
+        "spawn_initialize": percentiles(spawn),
+        "list_tools_warm": percentiles(listing),
+        "call_tool_warm": percentiles(calls)
+    }
+
+
+async def bench_pkgstore(workdir: Path, rounds: int) -> dict:
+    import shutil
+    import fake_registry
+    import pkgstore
+    from mcp_pool import ServerPool
+
+    if not shutil.which("npx"):
+        return {"ok": False, "error": "npx not found"}
+    registry = fake_registry.serve()
+    os.environ["npm_config_registry"] = f"http://127.0.0.1:{registry.server_port}/npm/"
+    os.environ["npm_config_cache"] = str(workdir / "npm-cache")
+    pkgstore.NPM_REGISTRY = os.environ["npm_config_registry"]
+    pkgstore.store = pkgstore.PackageStore(str(workdir / "pkgs"))
+    command = ["npx", "-y", "bench-mcp-server@1.0.0", "--tools", "40"]
+
+    async def spawn(i: int) -> float:
+        pool = ServerPool(max_live=1)
+        try:
+            start = time.perf_counter()
+            await pool._acquire(command, {"ROUND": str(i)})
+            return time.perf_counter() - start
+        finally:
+            await pool.close_all()
+
+    result = {"ok": True}
+    try:
+        for mode in ("off", "auto"):
+            pkgstore.PKGSTORE_MODE = mode
+            first = await spawn(-1)  # npm cache fill, or the store install
+            samples = [await spawn(i) for i in range(rounds)]
+            result["npx" if mode == "off" else "store"] = {"first_s": round(first, 3), **percentiles(samples)}
+    finally:
+        registry.shutdown()
+    return result
+
+
+async def bench_harvest(workdir: Path, repos: int) -> dict:
+    import fake_github
+    import harvest_meta
+
+    root = workdir / "harvest"
+    corpus.generate(root, repos)
+    api = fake_github.serve(latency=0.02)
+    url = f"http://127.0.0.1:{api.server_port}"
+
+    async def run(max_age: float = 0, cold: bool = False, **kwargs) -> dict:
+        if cold:
+            for meta in root.glob("gh/*/*/_meta-info.json"):
+                meta.unlink()
+        api.requests.clear()
+        start = time.perf_counter()
+        stats = await harvest_meta.harvest(
+            str(root / "gh"), max_age, api_url=url, graphql_url=url + "/graphql", **kwargs
+        )
+        return {"s": round(time.perf_counter() - start, 3), **stats, "api": dict(api.requests)}
+
+    result = {}
+    try:
+        result["serial"] = await run(cold=True, mode="rest", concurrency=1, state=harvest_meta.MetaState(str(workdir / "serial.sqlite")))
+        state = harvest_meta.MetaState(str(workdir / "meta.sqlite"))
+        result["graphql"] = await run(cold=True, mode="graphql", token="x", state=state)
+        result["fresh"] = await run(3600, mode="graphql", token="x", state=state)
+        rest = harvest_meta.MetaState(str(workdir / "rest.sqlite"))
+        await run(cold=True, mode="rest", state=rest)
+        api.epoch += 1
+        result["rest_revalidate"] = await run(mode="rest", state=rest)
+    finally:
+        api.shutdown()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", default="ingest,search,mcp,pkgstore,harvest")
+    parser.add_argument("--repos", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mcp-rounds", type=int, default=10)
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+    only = set(args.only.split(","))
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git": subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip(),
+        "params": vars(args)
+    }
+
+    with tempfile.TemporaryDirectory(prefix="infinitemcp-bench-") as tmp:
+        workdir = Path(tmp)
+        if only & {"ingest", "search"}:
+            readmes = corpus.generate(workdir, args.repos)
+            report["ingest"] = bench_ingest(workdir, readmes)
+        if "search" in only:
+            report["search"] = bench_search(workdir, args.requests, args.concurrency)
+        if "mcp" in only:
+            report["mcp"] = asyncio.run(bench_mcp(args.mcp_rounds))
+        if "pkgstore" in only:
+            report["pkgstore"] = asyncio.run(bench_pkgstore(workdir, args.mcp_rounds))
+        if "harvest" in only:
+            report["harvest"] = asyncio.run(bench_harvest(workdir, args.repos))
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
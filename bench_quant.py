@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Recall@k and latency of compressed first-pass search against full precision.
+
+Queries are noisy copies of sampled index rows; ground truth is exact search
+over the full-precision matrix, and the baseline latency is the float16 scan
+the local backend does without a first pass. "bytes" is what is stored on
+disk, "resident_bytes" what the first pass holds in RAM, which is what
+"compression" compares against the float16 matrix. Each variant is a quantization and an
+optional Matryoshka dims, e.g. int8, binary:1024, none:512.
+
+  ./bench_quant.py [index-dir] --variants int8 binary binary:1024 int8:512
+  ./bench_quant.py --synthetic 20000x1024      # no export needed
+
+Prints one JSON document.
+"""
+
+from local_search import top_k, BLOCK_ROWS
+from quantize import truncate, quantize, prepare, scores, nbytes, normalize
+from pathlib import Path
+import argparse
+import json
+import numpy as np
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("index", nargs="?", default="index")
+parser.add_argument("--synthetic", help="ROWSxDIMS random matrix instead of an exported index")
+parser.add_argument("--variants", nargs="+", default=["int8", "binary", "int8:512", "binary:1024", "none:256"])
+parser.add_argument("--queries", type=int, default=200)
+parser.add_argument("-k", type=int, default=10)
+parser.add_argument("--oversample", type=int, default=4)
+parser.add_argument("--noise", type=float, default=0.5)
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+if args.synthetic:
+    rows, dims = map(int, args.synthetic.lower().split("x"))
+    # Low-rank structure so neighbours are meaningful, like real embeddings
+    basis = rng.standard_normal((64, dims)).astype(np.float32)
+    full = normalize(rng.standard_normal((rows, 64)).astype(np.float32) @ basis + 0.3 * rng.standard_normal((rows, dims)).astype(np.float32))
+else:
+    full = normalize(np.load(Path(args.index) / "embeddings.npy").astype(np.float32))
+
+# What export_index.py stores and the local backend scans without a first pass
+stored = full.astype(np.float16)
+
+
+def exact_scores(q: np.ndarray) -> np.ndarray:
+    """LocalIndex.full_scores: float16 rows up-cast a block at a time"""
+    out = np.empty(len(stored), dtype=np.float32)
+    for start in range(0, len(stored), BLOCK_ROWS):
+        block = stored[start:start + BLOCK_ROWS]
+        out[start:start + len(block)] = block.astype(np.float32) @ q
+    return out
+
+
+picked = rng.choice(len(full), size=min(args.queries, len(full)), replace=False)
+queries = normalize(full[picked] + args.noise * rng.standard_normal((len(picked), full.shape[1])).astype(np.float32) / np.sqrt(full.shape[1]))
+truth = [set(top_k(full @ q, args.k).tolist()) for q in queries]
+
+start = time.perf_counter()
+for q in queries:
+    top_k(exact_scores(q), args.k)
+baseline_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+start = time.perf_counter()
+for q in queries:
+    top_k(full @ q, args.k)
+float32_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+report = {
+    "rows": int(full.shape[0]),
+    "dims": int(full.shape[1]),
+    "k": args.k,
+    "oversample": args.oversample,
+    "queries": len(queries),
+    "full_precision": {"bytes": int(stored.nbytes), "ms_per_query": round(baseline_ms, 3)},
+    # The same exact search with the whole matrix resident as float32, twice the bytes
+    "full_precision_float32": {"bytes": int(full.nbytes), "ms_per_query": round(float32_ms, 3)},
+    "variants": []
+}
+
+for variant in args.variants:
+    method, _, dims = variant.partition(":")
+    dims = int(dims) if dims else None
+    codes, scales = quantize(truncate(full, dims), method)
+    matrix = prepare(codes, method)
+
+    hits = 0
+    first_pass_hits = 0
+    start = time.perf_counter()
+    for q, expected in zip(queries, truth):
+        candidates = top_k(scores(matrix, scales, truncate(q, dims), method), args.k * args.oversample)
+        first_pass_hits += len(expected & set(candidates[:args.k].tolist()))
+        rescored = candidates[top_k(stored[candidates].astype(np.float32) @ q, args.k)]
+        hits += len(expected & set(rescored.tolist()))
+    elapsed = (time.perf_counter() - start) / len(queries) * 1000
+
+    report["variants"].append({
+        "variant": variant,
+        "bytes": int(nbytes(codes, scales)),
+        "resident_bytes": int(nbytes(matrix, scales)),
+        "compression": round(stored.nbytes / nbytes(matrix, scales), 2),
+        "recall_at_k_first_pass": round(first_pass_hits / (len(queries) * args.k), 4),
+        "recall_at_k_rescored": round(hits / (len(queries) * args.k), 4),
+        "ms_per_query": round(elapsed, 3)
+    })
+
+print(json.dumps(report, indent=2))
@@ -1,8 +1,93 @@
-import torch
-from sentence_transformers import SentenceTransformer
-_model='Octen/Octen-Embedding-8B'
-try:
-  model = SentenceTransformer(_model, trust_remote_code=True, device="cuda", model_kwargs={ "attn_implementation": "sdpa", 'dtype': torch.bfloat16  })
-except:
-  model = SentenceTransformer(_model, trust_remote_code=True, device="cpu", model_kwargs={ "attn_implementation": "sdpa", 'dtype': torch.bfloat16  })
+"""
+Process-wide embedding model, loaded lazily on first use.
 
+    model = common.get_model()
+
+`common.model` still works but loads the model the first time it is touched.
+load_report holds how long each loading phase took.
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+
+MODEL_NAME = os.environ.get('EMBED_MODEL', 'Octen/Octen-Embedding-8B')
+_model = MODEL_NAME
+
+_loaded = None
+_lock = threading.Lock()
+load_report = {}
+
+def _load_factory():
+  """EMBED_MODEL=module:callable builds a stand-in model, e.g. bench/fake_model.py"""
+  module, attr = MODEL_NAME.split(':', 1)
+  start = time.perf_counter()
+  model = getattr(importlib.import_module(module), attr)()
+  load_report.update({'weights_s': time.perf_counter() - start, 'device': 'cpu', 'device_placement_s': 0.0, 'warmup_s': 0.0})
+  load_report['total_s'] = load_report['weights_s']
+  return model
+
+def _load():
+  if ':' in MODEL_NAME:
+    return _load_factory()
+
+  import torch
+  from sentence_transformers import SentenceTransformer
+
+  # Pick the device first and load straight onto it; a CPU stage would hold
+  # the whole bf16 model in host RAM before the copy. Device initialization
+  # (the CUDA context) is timed on its own.
+  start = time.perf_counter()
+  device = "cpu"
+  if torch.cuda.is_available():
+    try:
+      torch.cuda.init()
+      device = "cuda"
+    except Exception as e:
+      print(f"falling back to cpu: {e}", file=sys.stderr)
+  load_report['device_placement_s'] = time.perf_counter() - start
+
+  start = time.perf_counter()
+  try:
+    model = SentenceTransformer(MODEL_NAME, trust_remote_code=True, device=device, model_kwargs={ "attn_implementation": "sdpa", 'dtype': torch.bfloat16  })
+  except Exception as e:
+    if device == "cpu":
+      raise
+    print(f"falling back to cpu: {e}", file=sys.stderr)
+    device = "cpu"
+    model = SentenceTransformer(MODEL_NAME, trust_remote_code=True, device=device, model_kwargs={ "attn_implementation": "sdpa", 'dtype': torch.bfloat16  })
+  load_report['weights_s'] = time.perf_counter() - start
+  load_report['device'] = device
+
+  start = time.perf_counter()
+  model.encode(["warmup"], show_progress_bar=False)
+  load_report['warmup_s'] = time.perf_counter() - start
+  load_report['total_s'] = load_report['weights_s'] + load_report['device_placement_s'] + load_report['warmup_s']
+
+  print(
+    f"loaded {MODEL_NAME} on {device}: weights {load_report['weights_s']:.2f}s, "
+    f"device init {load_report['device_placement_s']:.2f}s, warmup {load_report['warmup_s']:.2f}s",
+    file=sys.stderr
+  )
+  return model
+
+def get_model():
+  global _loaded
+  if _loaded is None:
+    with _lock:
+      if _loaded is None:
+        _loaded = _load()
+  return _loaded
+
+def model_loaded():
+  return _loaded is not None
+
+def preload():
+  """Start loading the model in the background"""
+  threading.Thread(target=get_model, daemon=True).start()
+
+def __getattr__(name):
+  if name == 'model':
+    return get_model()
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,79 @@
+"""
+Bounded cache of query embeddings keyed by model name and normalized text.
+
+Search traffic repeats the same handful of queries, and on a CPU host each
+encode of the 8B model costs hundreds of milliseconds. Entries can be written
+through to sqlite so a restarted server comes back warm.
+"""
+
+from pathlib import Path
+from ttl_cache import TTLCache, normalize_query
+import numpy as np
+import os
+import sqlite3
+import threading
+
+EMBED_CACHE_SIZE = int(os.environ.get("EMBED_CACHE_SIZE", 4096))
+EMBED_CACHE_PATH = os.environ.get("EMBED_CACHE_PATH", "")
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, maxsize: int = EMBED_CACHE_SIZE, path: str = EMBED_CACHE_PATH):
+        self.model_name = model_name
+        self.cache = TTLCache(maxsize=maxsize)
+        self.db = None
+        self._lock = threading.Lock()
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, text)
+                )
+            """)
+            self.db.commit()
+            self._load()
+
+    def _load(self):
+        rows = self.db.execute(
+            "SELECT text, vector FROM embeddings WHERE model = ? ORDER BY rowid DESC LIMIT ?",
+            (self.model_name, self.cache.maxsize)
+        ).fetchall()
+        for text, blob in reversed(rows):
+            self.cache.put(text, np.frombuffer(blob, dtype=np.float32))
+
+    def encode(self, model, texts: list[str]) -> np.ndarray:
+        """Embeddings for texts, encoding only the ones not already cached"""
+        keys = [normalize_query(t) for t in texts]
+        vectors = [self.cache.get(k) for k in keys]
+        # Keyed by the normalized form, but the model sees the first original text for each key
+        missing = {}
+        for k, t, v in zip(keys, texts, vectors):
+            if v is None:
+                missing.setdefault(k, t)
+
+        if missing:
+            encoded = np.asarray(model.encode(list(missing.values()), batch_size=len(missing)), dtype=np.float32)
+            fresh = dict(zip(missing, encoded))
+            for k, v in fresh.items():
+                self.cache.put(k, v)
+            self._persist(fresh)
+            vectors = [v if v is not None else fresh[k] for k, v in zip(keys, vectors)]
+
+        return np.stack(vectors)
+
+    def _persist(self, fresh: dict):
+        if self.db is None:
+            return
+        with self._lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text, vector) VALUES (?, ?, ?)",
+                [(self.model_name, k, v.tobytes()) for k, v in fresh.items()]
+            )
+            self.db.commit()
+
+    def stats(self) -> dict:
+        return {"model": self.model_name, **self.cache.stats()}
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Export the chroma index for the in-process local search backend.
+
+Writes to OUT (default ./index):
+  embeddings.npy  L2-normalized float16 matrix, memory-mapped at load time
+  meta.json       ids and the metadata the reranker needs, in matrix row order
+
+With --dims and/or --quantization int8|binary it also writes a compressed
+first-pass matrix (first_pass.npy, plus scales.npy for int8). It is held in
+RAM and scanned for candidates, which are rescored against embeddings.npy.
+
+--collection tools exports the per-tool index written by insert_tools.py,
+for search_tools on the local backend:
+
+  ./export_index.py index-tools --collection tools
+"""
+
+from pathlib import Path
+from quantize import truncate, quantize, QUANTIZATIONS
+import argparse
+import chromadb
+import numpy as np
+import json
+
+parser = argparse.ArgumentParser()
+parser.add_argument("out", nargs="?", default="index")
+parser.add_argument("--dims", type=int, default=None, help="Matryoshka-truncate first-pass vectors to this many dims")
+parser.add_argument("--quantization", choices=QUANTIZATIONS, default="none")
+parser.add_argument("--collection", default="documents")
+args = parser.parse_args()
+
+out = Path(args.out)
+out.mkdir(parents=True, exist_ok=True)
+
+client = chromadb.PersistentClient(path="./chroma_db")
+collection = client.get_collection(name=args.collection)
+data = collection.get(include=["embeddings", "metadatas"])
+
+embeddings = np.asarray(data["embeddings"], dtype=np.float32)
+embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+np.save(out / "embeddings.npy", embeddings.astype(np.float16))
+
+first_pass = None
+for stale in ("first_pass.npy", "scales.npy"):
+  (out / stale).unlink(missing_ok=True)
+if args.dims or args.quantization != "none":
+  codes, scales = quantize(truncate(embeddings, args.dims), args.quantization)
+  np.save(out / "first_pass.npy", codes)
+  if scales is not None:
+    np.save(out / "scales.npy", scales)
+  first_pass = {"dims": args.dims, "quantization": args.quantization}
+
+metadatas = [
+  {k: v for k, v in m.items() if k not in ("config",)}
+  for m in data["metadatas"]
+]
+with open(out / "meta.json", "w") as f:
+  json.dump({"ids": data["ids"], "metadatas": metadatas, "first_pass": first_pass}, f, separators=(",", ":"))
+
+print(f"exported {len(data['ids'])} x {embeddings.shape[1]} to {out}")
@@ -0,0 +1,78 @@
+"""
+Structured search filters, evaluated inside the vector store query.
+
+  runner            "npx" or "uvx"
+  no_credentials    only servers whose one_liner requires no env vars
+  exclude_archived  drop archived repos
+  min_stars         minimum stargazer count
+
+They map onto the runner / n_requires / archived / stars metadata columns
+written by insert_chroma.py, so indexes built before those columns existed
+must be rebuilt (./extracto --full) before filters return anything.
+"""
+
+from typing import Mapping
+import json
+import numpy as np
+
+RUNNERS = ("npx", "uvx")
+
+
+def _truthy(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def parse_filters(args: Mapping) -> dict:
+    """Canonical filters from query-string or JSON arguments; unknown keys are ignored"""
+    filters = {}
+    runner = args.get("runner")
+    if runner:
+        if runner not in RUNNERS:
+            raise ValueError(f"runner must be one of {', '.join(RUNNERS)}")
+        filters["runner"] = runner
+    if _truthy(args.get("no_credentials", False)):
+        filters["no_credentials"] = True
+    if _truthy(args.get("exclude_archived", False)):
+        filters["exclude_archived"] = True
+    if args.get("min_stars") not in (None, ""):
+        filters["min_stars"] = int(args["min_stars"])
+    return filters
+
+
+def filters_key(filters: dict) -> str:
+    return json.dumps(filters, sort_keys=True)
+
+
+def chroma_where(filters: dict) -> dict | None:
+    """The chroma `where` clause for filters, or None when there are none"""
+    clauses = []
+    if "runner" in filters:
+        clauses.append({"runner": filters["runner"]})
+    if filters.get("no_credentials"):
+        clauses.append({"n_requires": 0})
+    if filters.get("exclude_archived"):
+        clauses.append({"archived": False})
+    if "min_stars" in filters:
+        clauses.append({"stars": {"$gte": filters["min_stars"]}})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def mask(columns: dict, filters: dict) -> np.ndarray | None:
+    """Boolean row mask over column arrays for the local backend, or None when there are no filters"""
+    if not filters:
+        return None
+    keep = np.ones(len(columns["stars"]), dtype=bool)
+    if "runner" in filters:
+        keep &= columns["runner"] == filters["runner"]
+    if filters.get("no_credentials"):
+        keep &= columns["n_requires"] == 0
+    if filters.get("exclude_archived"):
+        keep &= ~columns["archived"]
+    if "min_stars" in filters:
+        keep &= columns["stars"] >= filters["min_stars"]
+    return keep
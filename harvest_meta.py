@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Fetch GitHub metadata for the gh/ crawl into each repo's _meta-info.json.
+
+Writes the same fields `gh repo view --json archivedAt,forkCount,pushedAt,
+stargazerCount,watchers` does, which ranking.meta_features reads. Instead of
+one gh call per repo with a sleep in between:
+
+  - only entries older than --max-age are refreshed; when they were fetched
+    is kept in sqlite (a _meta-info.json with no state counts from its mtime)
+  - with a token, repos are fetched --batch at a time, one aliased
+    repository() field each, in a single GraphQL query
+  - without one, each repo is a REST request carrying the ETag of the last
+    response, so unchanged repos come back 304 and cost no quota
+  - up to --concurrency requests are in flight, and all of them wait for the
+    window to reset when the rate limit headers say the budget is spent
+
+    ./harvest_meta.py [gh] [--max-age 86400] [--mode auto|graphql|rest]
+
+GITHUB_API_URL points it at another API, such as bench/fake_github.py. The
+token comes from GITHUB_TOKEN, GH_TOKEN or `gh auth token`.
+"""
+
+from pathlib import Path
+import argparse
+import asyncio
+import httpx
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+GITHUB_GRAPHQL_URL = os.environ.get("GITHUB_GRAPHQL_URL", GITHUB_API_URL.rstrip("/") + "/graphql")
+META_STATE_PATH = os.environ.get(
+    "INFINITEMCP_META_STATE",
+    str(Path.home() / ".cache" / "infinitemcp" / "meta.sqlite")
+)
+META_MAX_AGE = float(os.environ.get("INFINITEMCP_META_MAX_AGE", 24 * 3600))
+GRAPHQL_BATCH = 50
+CONCURRENCY = 4
+RATE_RESERVE = 10
+MAX_RATE_WAIT = 3600
+RETRIES = 3
+
+FIELDS = "archivedAt forkCount pushedAt stargazerCount watchers { totalCount }"
+
+
+class BudgetExhausted(Exception):
+    pass
+
+
+class RateBudget:
+    """Requests left in the current rate limit window, shared by every worker"""
+
+    def __init__(self, reserve: int = RATE_RESERVE, max_wait: float = MAX_RATE_WAIT):
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.remaining: int | None = None
+        self.reset_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def update(self, headers: httpx.Headers):
+        if "x-ratelimit-remaining" in headers:
+            self.remaining = int(headers["x-ratelimit-remaining"])
+            self.reset_at = float(headers.get("x-ratelimit-reset", 0))
+
+    async def take(self):
+        async with self.lock:
+            if self.remaining is not None and self.remaining <= self.reserve:
+                wait = self.reset_at - time.time()
+                if wait > self.max_wait:
+                    raise BudgetExhausted(f"rate limit resets in {wait:.0f}s")
+                if wait > 0:
+                    print(f"rate limit spent, waiting {wait:.0f}s", file=sys.stderr)
+                    await asyncio.sleep(wait)
+                self.remaining = None
+            if self.remaining is not None:
+                self.remaining -= 1
+
+
+class MetaState:
+    def __init__(self, path: str = META_STATE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS repos (
+                repo TEXT PRIMARY KEY,
+                fetched_at REAL NOT NULL,
+                etag TEXT,
+                found INTEGER NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    def rows(self) -> dict[str, tuple[float, str | None]]:
+        """repo -> (fetched_at, etag)"""
+        return {
+            repo: (fetched_at, etag)
+            for repo, fetched_at, etag in self.db.execute("SELECT repo, fetched_at, etag FROM repos")
+        }
+
+    def put(self, repo: str, found: bool, etag: str | None = None, fetched_at: float | None = None):
+        self.db.execute(
+            "INSERT OR REPLACE INTO repos (repo, fetched_at, etag, found) VALUES (?, ?, ?, ?)",
+            (repo, fetched_at or time.time(), etag, int(found))
+        )
+
+    def commit(self):
+        self.db.commit()
+
+
+def repo_dirs(root: str = "gh") -> dict[str, Path]:
+    """owner/name -> its directory in the crawl"""
+    return {
+        f"{path.parent.name}/{path.name}": path
+        for path in sorted(Path(root).glob("*/*"))
+        if path.is_dir()
+    }
+
+
+def from_rest(data: dict, previous: dict | None) -> dict:
+    """The GraphQL shape from a REST repo; REST only says whether it is archived, not since when"""
+    archived_at = None
+    if data.get("archived"):
+        archived_at = (previous or {}).get("archivedAt") or data.get("updated_at")
+    return {
+        "archivedAt": archived_at,
+        "forkCount": data.get("forks_count", 0),
+        "pushedAt": data.get("pushed_at"),
+        "stargazerCount": data.get("stargazers_count", 0),
+        "watchers": {"totalCount": data.get("subscribers_count", 0)}
+    }
+
+
+def write_meta(path: Path, meta: dict):
+    """Atomically replace _meta-info.json, leaving it untouched when nothing changed"""
+    target = path / "_meta-info.json"
+    text = json.dumps(meta)
+    try:
+        if target.read_text() == text:
+            return
+    except OSError:
+        pass
+    tmp = target.with_suffix(".tmp")
+    tmp.write_text(text)
+    os.replace(tmp, target)
+
+
+def read_meta(path: Path) -> dict | None:
+    try:
+        return json.loads((path / "_meta-info.json").read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def batch_query(repos: list[str]) -> tuple[str, dict]:
+    params, fields, variables = [], [], {}
+    for i, repo in enumerate(repos):
+        owner, name = repo.split("/", 1)
+        params.append(f"$o{i}: String!, $n{i}: String!")
+        fields.append(f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ {FIELDS} }}")
+        variables[f"o{i}"] = owner
+        variables[f"n{i}"] = name
+    return f"query({', '.join(params)}) {{ {' '.join(fields)} }}", variables
+
+
+class Harvester:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        state: MetaState,
+        dirs: dict[str, Path],
+        concurrency: int = CONCURRENCY,
+        api_url: str = GITHUB_API_URL,
+        graphql_url: str = GITHUB_GRAPHQL_URL,
+        max_wait: float = MAX_RATE_WAIT
+    ):
+        self.client = client
+        self.state = state
+        self.dirs = dirs
+        self.api_url = api_url.rstrip("/")
+        self.graphql_url = graphql_url
+        self.sem = asyncio.Semaphore(concurrency)
+        self.budgets = {"graphql": RateBudget(max_wait=max_wait), "core": RateBudget(max_wait=max_wait)}
+        self.stats = {"requests": 0, "updated": 0, "unchanged": 0, "missing": 0, "failed": 0}
+
+    async def request(self, kind: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """One request under the concurrency limit and rate budget, retrying secondary limits and 5xx"""
+        budget = self.budgets[kind]
+        for attempt in range(RETRIES):
+            async with self.sem:
+                await budget.take()
+                self.stats["requests"] += 1
+                response = await self.client.request(method, url, **kwargs)
+            budget.update(response.headers)
+            retry_after = response.headers.get("retry-after")
+            if response.status_code in (403, 429) and (retry_after or budget.remaining == 0):
+                # A spent primary limit is waited out (or given up on) by the next take()
+                if retry_after:
+                    await asyncio.sleep(float(retry_after))
+                continue
+            if response.status_code >= 500 and attempt < RETRIES - 1:
+                await asyncio.sleep(2 ** attempt)
+                continue
+            return response
+        return response
+
+    def found(self, repo: str, meta: dict, etag: str | None = None):
+        before = read_meta(self.dirs[repo])
+        write_meta(self.dirs[repo], meta)
+        self.state.put(repo, True, etag)
+        self.stats["updated" if meta != before else "unchanged"] += 1
+
+    def missing(self, repo: str):
+        self.state.put(repo, False)
+        self.stats["missing"] += 1
+
+    async def graphql(self, repos: list[str]):
+        query, variables = batch_query(repos)
+        try:
+            response = await self.request("graphql", "POST", self.graphql_url, json={"query": query, "variables": variables})
+            response.raise_for_status()
+            body = response.json()
+        except BudgetExhausted:
+            raise
+        except Exception as e:
+            print(f"batch of {len(repos)} failed: {e}", file=sys.stderr)
+            self.stats["failed"] += len(repos)
+            return
+        data = body.get("data") or {}
+        not_found = {
+            err["path"][0] for err in body.get("errors") or []
+            if err.get("type") == "NOT_FOUND" and err.get("path")
+        }
+        for i, repo in enumerate(repos):
+            meta = data.get(f"r{i}")
+            if meta is not None:
+                self.found(repo, meta)
+            elif f"r{i}" in not_found:
+                self.missing(repo)
+            else:
+                self.stats["failed"] += 1
+        self.state.commit()
+
+    async def rest(self, repo: str, etag: str | None):
+        headers = {"If-None-Match": etag} if etag else {}
+        try:
+            response = await self.request("core", "GET", f"{self.api_url}/repos/{repo}", headers=headers)
+        except BudgetExhausted:
+            raise
+        except Exception as e:
+            print(f"{repo}: {e}", file=sys.stderr)
+            self.stats["failed"] += 1
+            return
+        if response.status_code == 304:
+            if read_meta(self.dirs[repo]) is None:
+                return await self.rest(repo, None)
+            self.state.put(repo, True, etag)
+            self.stats["unchanged"] += 1
+        elif response.status_code in (404, 451):
+            self.missing(repo)
+        elif response.status_code == 200:
+            meta = from_rest(response.json(), read_meta(self.dirs[repo]))
+            self.found(repo, meta, response.headers.get("etag"))
+        else:
+            print(f"{repo}: HTTP {response.status_code}", file=sys.stderr)
+            self.stats["failed"] += 1
+        self.state.commit()
+
+
+def stale_repos(dirs: dict[str, Path], state: MetaState, max_age: float) -> list[tuple[str, str | None]]:
+    """(repo, etag) for every repo due a refresh, oldest first"""
+    rows = state.rows()
+    now = time.time()
+    due = []
+    for repo, path in dirs.items():
+        fetched_at, etag = rows.get(repo, (None, None))
+        if fetched_at is None:
+            try:
+                meta_file = path / "_meta-info.json"
+                if meta_file.stat().st_size > 0:
+                    fetched_at = meta_file.stat().st_mtime
+                    state.put(repo, True, None, fetched_at)
+            except OSError:
+                pass
+        if fetched_at is None or now - fetched_at >= max_age:
+            due.append((fetched_at or 0, repo, etag))
+    state.commit()
+    return [(repo, etag) for _, repo, etag in sorted(due)]
+
+
+def github_token() -> str | None:
+    token = os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
+    if token or not shutil.which("gh"):
+        return token
+    result = subprocess.run(["gh", "auth", "token"], capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+async def harvest(
+    root: str = "gh",
+    max_age: float = META_MAX_AGE,
+    mode: str = "auto",
+    batch: int = GRAPHQL_BATCH,
+    concurrency: int = CONCURRENCY,
+    token: str | None = None,
+    state: MetaState | None = None,
+    api_url: str = GITHUB_API_URL,
+    graphql_url: str = GITHUB_GRAPHQL_URL,
+    max_wait: float = MAX_RATE_WAIT
+) -> dict:
+    """Refresh every stale _meta-info.json under root and return counts of what happened"""
+    state = state or MetaState()
+    dirs = repo_dirs(root)
+    due = stale_repos(dirs, state, max_age)
+    if mode == "auto":
+        mode = "graphql" if token else "rest"
+    if mode == "graphql" and not token:
+        raise SystemExit("GraphQL needs a token: set GITHUB_TOKEN or log in with gh")
+    print(f"{len(due)} of {len(dirs)} repos stale, fetching with {mode}", file=sys.stderr)
+
+    headers = {"Accept": "application/vnd.github+json", "User-Agent": "infinitemcp-harvest"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=httpx.Timeout(60.0, connect=10.0)) as client:
+        harvester = Harvester(client, state, dirs, concurrency, api_url, graphql_url, max_wait)
+        if mode == "graphql":
+            repos = [repo for repo, _ in due]
+            jobs = [harvester.graphql(repos[i:i + batch]) for i in range(0, len(repos), batch)]
+        else:
+            jobs = [harvester.rest(repo, etag) for repo, etag in due]
+        # Once the budget is spent every remaining job raises BudgetExhausted right away
+        for error in await asyncio.gather(*jobs, return_exceptions=True):
+            if isinstance(error, BudgetExhausted):
+                print(f"stopping: {error}", file=sys.stderr)
+                break
+            if isinstance(error, BaseException):
+                raise error
+        state.commit()
+    return {"repos": len(dirs), "stale": len(due), "mode": mode, **harvester.stats}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh _meta-info.json for the gh/ crawl")
+    parser.add_argument("root", nargs="?", default="gh")
+    parser.add_argument("--max-age", type=float, default=META_MAX_AGE, help="seconds before an entry is refetched")
+    parser.add_argument("--mode", choices=("auto", "graphql", "rest"), default="auto")
+    parser.add_argument("--batch", type=int, default=GRAPHQL_BATCH, help="repos per GraphQL query")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--max-wait", type=float, default=MAX_RATE_WAIT, help="longest rate limit reset to wait for before stopping")
+    args = parser.parse_args()
+    result = asyncio.run(harvest(
+        args.root, args.max_age, args.mode, args.batch, args.concurrency, github_token(),
+        max_wait=args.max_wait
+    ))
+    print(json.dumps(result))
@@ -2,28 +2,118 @@
 """
 InfiniteMCP Server - A meta-MCP server for discovering and using other MCP servers
 
-Provides three main tools:
+Provides these tools:
 1. search_mcp - Search for relevant MCP servers, returns structured config
+   (search_mcp_many runs several searches in one call; search_tools finds
+   individual functions across servers)
 2. list_tools - Get available functions from a specific MCP server
 3. execute_function - Run a function from an MCP server with parameters and credentials
+   (execute_many runs several calls concurrently; read_result pages through
+   results too large to return at once)
 """
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 import mcp.types as types
+from mcp_pool import pool, server_key
+from tool_cache import tool_cache, cache_key
+import tool_view
+from ttl_cache import TTLCache, normalize_query
+from filters import parse_filters, filters_key
+from metrics import counter, histogram, timer, render
+from mcp.server.lowlevel.helper_types import ReadResourceContents
 import httpx
-import subprocess
 import json
 import os
+import sys
 from typing import Any
 import asyncio
+import time
+import uuid
 
 # Configuration
-SEARCH_API_URL = "https://day50.dev/infinite/search"
+SEARCH_API_URL = os.environ.get("INFINITEMCP_SEARCH_URL", "https://day50.dev/infinite/search")
+SEARCH_BACKEND = os.environ.get("INFINITEMCP_BACKEND", "remote")  # "remote" or "local"
+HTTP_MAX_CONNECTIONS = int(os.environ.get("INFINITEMCP_HTTP_MAX_CONNECTIONS", 20))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("INFINITEMCP_HTTP_MAX_KEEPALIVE", 10))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("INFINITEMCP_HTTP_KEEPALIVE_EXPIRY", 60))
+SEARCH_CACHE_SIZE = int(os.environ.get("INFINITEMCP_SEARCH_CACHE_SIZE", 512))
+SEARCH_CACHE_TTL = float(os.environ.get("INFINITEMCP_SEARCH_CACHE_TTL", 600))
+RESULT_PAGE_CHARS = int(os.environ.get("INFINITEMCP_RESULT_PAGE_CHARS", 20000))
+RESULT_PAGES = int(os.environ.get("INFINITEMCP_RESULT_PAGES", 32))
+RESULT_PAGE_TTL = float(os.environ.get("INFINITEMCP_RESULT_PAGE_TTL", 600))
+MAX_PARALLEL_CALLS = int(os.environ.get("INFINITEMCP_MAX_PARALLEL_CALLS", 8))
+CALL_TIMEOUT = float(os.environ.get("INFINITEMCP_CALL_TIMEOUT", 60))
+LIST_FORMAT = os.environ.get("INFINITEMCP_LIST_FORMAT", "compact")  # "compact" or "full"
+PREWARM = os.environ.get("INFINITEMCP_PREWARM", "0") == "1"
+PREWARM_TOP = int(os.environ.get("INFINITEMCP_PREWARM_TOP", 2))
+PREWARM_MAX = int(os.environ.get("INFINITEMCP_PREWARM_MAX", 3))
+
+search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+# Unread remainders of oversized execute_function results, by cursor
+result_pages = TTLCache(maxsize=RESULT_PAGES, ttl=RESULT_PAGE_TTL)
+# Caps concurrent downstream calls across all execute_many requests
+call_slots = asyncio.Semaphore(MAX_PARALLEL_CALLS)
+
+STAGE_SECONDS = histogram("infinitemcp_stage_seconds", "Time per request stage", ["stage"])
+CACHE_LOOKUPS = counter("infinitemcp_cache_lookups_total", "Search and tool cache lookups", ["cache", "result"])
+PREWARMS = counter("infinitemcp_prewarms_total", "Speculative server starts after a search, by outcome", ["outcome"])
+TOOL_CALLS = counter("infinitemcp_tool_calls_total", "InfiniteMCP tool calls, by tool and outcome", ["tool", "outcome"])
+METRICS_URI = "infinitemcp://metrics"
+_http_client: httpx.AsyncClient | None = None
+
+
+def http_client() -> httpx.AsyncClient:
+    """
+    The shared keep-alive client for the search API. HTTP/2 is used when the
+    h2 package is installed (httpx[http2]).
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        _http_client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(30.0, connect=5.0)
+        )
+    return _http_client
+
 
 app = Server("infinitemcp")
 
+SEARCH_FILTERS_SCHEMA = {
+    "type": "object",
+    "description": "Optional filters applied inside the index before ranking",
+    "properties": {
+        "runner": {
+            "type": "string",
+            "enum": ["npx", "uvx"],
+            "description": "Only servers launched with this runner"
+        },
+        "no_credentials": {
+            "type": "boolean",
+            "description": "Only servers that need no API keys or tokens"
+        },
+        "exclude_archived": {
+            "type": "boolean",
+            "description": "Leave out archived repositories"
+        },
+        "min_stars": {
+            "type": "integer",
+            "description": "Minimum GitHub stars"
+        }
+    }
+}
+
 
 @app.list_tools()
 async def handle_list_tools() -> list[Tool]:  # <-- Changed name
@@ -38,8 +128,57 @@ async def handle_list_tools() -> list[Tool]:  # <-- Changed name
                     "query": {
                         "type": "string",
                         "description": "Natural language query describing what you want to do (e.g., 'web search', 'github integration', 'file system access')"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum number of servers to return",
+                        "default": 5
+                    },
+                    "filters": SEARCH_FILTERS_SCHEMA
+                },
+                "required": ["query"]
+            }
+        ),
+        Tool(
+            name="search_mcp_many",
+            description="Run several search_mcp queries in one call. Use this instead of repeated search_mcp calls when comparing options or planning multiple steps.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "queries": {
+                        "type": "array",
+                        "description": "Searches to run; results come back in the same order",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "query": {"type": "string"},
+                                "limit": {"type": "integer", "default": 5},
+                                "filters": SEARCH_FILTERS_SCHEMA
+                            },
+                            "required": ["query"]
+                        }
                     }
                 },
+                "required": ["queries"]
+            }
+        ),
+        Tool(
+            name="search_tools",
+            description="Search individual functions across all indexed MCP servers. Returns each match with its server config, function name and parameter schema, ready for execute_function without calling list_tools first.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "What the function should do (e.g., 'create a github issue', 'send a slack message')"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum number of functions to return",
+                        "default": 5
+                    },
+                    "filters": SEARCH_FILTERS_SCHEMA
+                },
                 "required": ["query"]
             }
         ),
@@ -64,6 +203,21 @@ async def handle_list_tools() -> list[Tool]:  # <-- Changed name
                                 "description": "Required environment variables"
                             }
                         }
+                    },
+                    "env_vars": {
+                        "type": "object",
+                        "description": "Environment variables to start the server with. Pass the same ones you will use with execute_function so the running server is reused.",
+                        "default": {}
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["compact", "full"],
+                        "description": "compact: one signature line per function plus shared types; full: every function's complete JSON schema",
+                        "default": LIST_FORMAT
+                    },
+                    "tool": {
+                        "type": "string",
+                        "description": "Return only this function, with its complete schema"
                     }
                 },
                 "required": ["config"]
@@ -106,6 +260,56 @@ async def handle_list_tools() -> list[Tool]:  # <-- Changed name
                 },
                 "required": ["config", "function_name"]
             }
+        ),
+        Tool(
+            name="execute_many",
+            description="Execute several functions at once, on the same or different MCP servers. Calls run concurrently; each one reports its own result, error or timeout.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "calls": {
+                        "type": "array",
+                        "description": "The calls to make, each shaped like execute_function arguments",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "config": {
+                                    "type": "object",
+                                    "properties": {
+                                        "one_liner": {"type": "array", "items": {"type": "string"}},
+                                        "requires": {"type": "array", "items": {"type": "string"}}
+                                    }
+                                },
+                                "function_name": {"type": "string"},
+                                "parameters": {"type": "object", "default": {}},
+                                "env_vars": {"type": "object", "default": {}},
+                                "timeout": {"type": "number", "description": "Seconds before this call is abandoned"}
+                            },
+                            "required": ["config", "function_name"]
+                        }
+                    },
+                    "timeout": {
+                        "type": "number",
+                        "description": "Default seconds per call",
+                        "default": CALL_TIMEOUT
+                    }
+                },
+                "required": ["calls"]
+            }
+        ),
+        Tool(
+            name="read_result",
+            description="Read the next page of an execute_function result that was too large to return at once.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "cursor": {
+                        "type": "string",
+                        "description": "The cursor given at the end of the previous page"
+                    }
+                },
+                "required": ["cursor"]
+            }
         )
     ]
 
@@ -115,14 +319,53 @@ async def call_tool(name: str, arguments: Any) -> list[types.TextContent | types
     """Handle tool calls"""
     
     if name == "search_mcp":
-        return await search_mcp(arguments)
+        handler = search_mcp
+    elif name == "search_mcp_many":
+        handler = search_mcp_many
+    elif name == "search_tools":
+        handler = search_tools
     elif name == "list_tools":
-        return await list_mcp_tools(arguments)
+        handler = list_mcp_tools
     elif name == "execute_function":
-        return await execute_function(arguments)
+        handler = execute_function
+    elif name == "execute_many":
+        handler = execute_many
+    elif name == "read_result":
+        handler = read_result
     else:
         raise ValueError(f"Unknown tool: {name}")
 
+    with timer(STAGE_SECONDS, stage=name):
+        result = await handler(arguments)
+    TOOL_CALLS.inc(tool=name, outcome="error" if failed(result) else "ok")
+    return result
+
+
+def failed(result) -> bool:
+    """Handlers report failures as an error result or error text rather than raising"""
+    if isinstance(result, types.CallToolResult):
+        return bool(result.isError)
+    return bool(result) and result[0].type == "text" and result[0].text.startswith(("Error", "⚠️"))
+
+
+@app.list_resources()
+async def handle_list_resources() -> list[types.Resource]:
+    return [
+        types.Resource(
+            uri=METRICS_URI,
+            name="metrics",
+            description="Latency histograms, cache and pool counters in Prometheus text format",
+            mimeType="text/plain"
+        )
+    ]
+
+
+@app.read_resource()
+async def handle_read_resource(uri) -> list[ReadResourceContents]:
+    if str(uri) != METRICS_URI:
+        raise ValueError(f"Unknown resource: {uri}")
+    return [ReadResourceContents(content=render(), mime_type="text/plain")]
+
 
 async def search_mcp(arguments: dict) -> list[TextContent]:
     """Search for MCP servers using the search API"""
@@ -130,17 +373,28 @@ async def search_mcp(arguments: dict) -> list[TextContent]:
     limit = arguments.get("limit", 5)
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                SEARCH_API_URL,
-                params={"q": query},
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-        
+        filters = parse_filters(arguments.get("filters") or {})
+        # Normalized only for the cache key; the search embeds the text as given
+        key = (normalize_query(query), limit, filters_key(filters))
+        data = search_cache.get(key)
+        CACHE_LOOKUPS.inc(cache="search", result="miss" if data is None else "hit")
+        if data is None:
+            if SEARCH_BACKEND == "local":
+                import local_search
+                with timer(STAGE_SECONDS, stage="search_local"):
+                    data = await asyncio.to_thread(local_search.search, query, limit, filters)
+            else:
+                with timer(STAGE_SECONDS, stage="search_http"):
+                    response = await http_client().get(
+                        SEARCH_API_URL,
+                        params={"q": query, "limit": limit, **{k: str(v).lower() for k, v in filters.items()}}
+                    )
+                    response.raise_for_status()
+                    data = response.json()
+            search_cache.put(key, data)
         
         results = data.get("results", [])
+        prewarm(results[:PREWARM_TOP])
         
         if not results:
             return [TextContent(
@@ -166,11 +420,111 @@ async def search_mcp(arguments: dict) -> list[TextContent]:
         )]
 
 
+async def search_mcp_many(arguments: dict) -> list[TextContent]:
+    """Several searches with one round trip: cache misses go to /search/batch together"""
+    queries = arguments.get("queries") or []
+    if not queries:
+        return [TextContent(type="text", text="Error: 'queries' must be a non-empty list")]
+
+    try:
+        requests = []
+        for item in queries:
+            filters = parse_filters(item.get("filters") or {})
+            requests.append((item["query"], item.get("limit", 5), filters))
+
+        keys = [(normalize_query(q), limit, filters_key(filters)) for q, limit, filters in requests]
+        data = [search_cache.get(key) for key in keys]
+        missing = [i for i, d in enumerate(data) if d is None]
+        for d in data:
+            CACHE_LOOKUPS.inc(cache="search", result="miss" if d is None else "hit")
+
+        if missing:
+            todo = [requests[i] for i in missing]
+            if SEARCH_BACKEND == "local":
+                import local_search
+                with timer(STAGE_SECONDS, stage="search_local"):
+                    fetched = await asyncio.to_thread(local_search.search_many, todo)
+            else:
+                with timer(STAGE_SECONDS, stage="search_http"):
+                    response = await http_client().post(
+                        SEARCH_API_URL.rstrip("/") + "/batch",
+                        json={"queries": [{"q": q, "limit": limit, "filters": filters} for q, limit, filters in todo]}
+                    )
+                    response.raise_for_status()
+                    fetched = response.json()["responses"]
+            for i, d in zip(missing, fetched):
+                data[i] = d
+                search_cache.put(keys[i], d)
+
+        prewarm([r for d in data for r in d.get("results", [])[:PREWARM_TOP]])
+
+        output = f"# Results for {len(queries)} searches\n\n"
+        for item, d in zip(queries, data):
+            results = d.get("results", [])
+            output += f"## '{item['query']}': {len(results)} servers\n\n"
+            output += "```json\n" + json.dumps(results, indent=2) + "\n```\n\n"
+        output += "To use a server, call `list_tools` with its config object, then `execute_function`.\n"
+        return [TextContent(type="text", text=output)]
+
+    except Exception as e:
+        return [TextContent(
+            type="text",
+            text=f"Error searching MCP servers: {str(e)}"
+        )]
+
+
+async def search_tools(arguments: dict) -> list[TextContent]:
+    """Search the per-tool index built by insert_tools.py"""
+    query = arguments["query"]
+    limit = arguments.get("limit", 5)
+
+    try:
+        filters = parse_filters(arguments.get("filters") or {})
+        key = ("tools", normalize_query(query), limit, filters_key(filters))
+        data = search_cache.get(key)
+        CACHE_LOOKUPS.inc(cache="search", result="miss" if data is None else "hit")
+        if data is None:
+            if SEARCH_BACKEND == "local":
+                import local_search
+                with timer(STAGE_SECONDS, stage="search_local"):
+                    data = await asyncio.to_thread(local_search.search_tools, query, limit, filters)
+            else:
+                with timer(STAGE_SECONDS, stage="search_http"):
+                    response = await http_client().get(
+                        SEARCH_API_URL.rstrip("/") + "/tools",
+                        params={"q": query, "limit": limit, **{k: str(v).lower() for k, v in filters.items()}}
+                    )
+                    response.raise_for_status()
+                    data = response.json()
+            search_cache.put(key, data)
+
+        results = data.get("results", [])
+        if not results:
+            return [TextContent(
+                type="text",
+                text=f"No functions found matching '{query}'. Try search_mcp to find servers instead."
+            )]
+
+        output = f"# Found {len(results)} functions for: '{query}'\n\n"
+        output += "```json\n"
+        output += json.dumps(results, indent=2)
+        output += "\n```\n\n"
+        output += "To use one, call `execute_function` with its config, function_name and parameters matching inputSchema.\n"
+        return [TextContent(type="text", text=output)]
+
+    except Exception as e:
+        return [TextContent(
+            type="text",
+            text=f"Error searching functions: {str(e)}"
+        )]
+
+
 async def list_mcp_tools(arguments: dict) -> list[TextContent]:
     """List tools available in a specific MCP server"""
     config = arguments["config"]
     one_liner = config.get("one_liner", [])
     requires = config.get("requires", [])
+    env_vars = arguments.get("env_vars", {})
     
     if not one_liner:
         return [TextContent(
@@ -179,26 +533,34 @@ async def list_mcp_tools(arguments: dict) -> list[TextContent]:
         )]
     
     try:
-        # Start the MCP server and query its tools
-        tools = await query_mcp_server_tools(one_liner)
+        view = await tools_view(one_liner, env_vars)
         
-        if not tools:
+        if not view.tools:
             return [TextContent(
                 type="text",
                 text=f"No tools found for MCP server: {' '.join(one_liner)}"
             )]
+
+        if arguments.get("tool"):
+            expanded = view.expand(arguments["tool"])
+            if expanded is None:
+                return [TextContent(
+                    type="text",
+                    text=f"Error: no function '{arguments['tool']}' in {' '.join(one_liner)}. "
+                         f"Available: {', '.join(view.tools)}"
+                )]
+            return [TextContent(type="text", text=expanded)]
         
         output = f"# Tools available in: {' '.join(one_liner)}\n\n"
         
         if requires:
             output += f"**Required environment variables**: {', '.join(requires)}\n\n"
         
-        output += "## Available Functions\n\n"
-        
-        for tool in tools:
-            output += f"### {tool['name']}\n"
-            output += f"{tool.get('description', 'No description')}\n\n"
-            output += f"**Parameters**:\n```json\n{json.dumps(tool.get('inputSchema', {}), indent=2)}\n```\n\n"
+        if arguments.get("format", LIST_FORMAT) == "full":
+            output += view.full()
+        else:
+            output += view.compact()
+            output += "\n`?` marks optional parameters. Call `list_tools` with `tool` set to a function name for its full schema.\n"
         
         output += f"\n**To execute**: Use `execute_function` with this config and the function name.\n"
         
@@ -213,7 +575,7 @@ async def list_mcp_tools(arguments: dict) -> list[TextContent]:
         )]
 
 
-async def execute_function(arguments: dict) -> list[TextContent]:
+async def execute_function(arguments: dict, budget: int = RESULT_PAGE_CHARS) -> types.CallToolResult | list[TextContent]:
     """Execute a function from an MCP server"""
     config = arguments["config"]
     function_name = arguments["function_name"]
@@ -241,22 +603,13 @@ async def execute_function(arguments: dict) -> list[TextContent]:
         )]
     
     try:
-        # Execute the function
         result = await execute_mcp_function(
             command=one_liner,
             function_name=function_name,
             parameters=parameters,
-            env_vars=env_vars
+            env_vars=env_vars,
+            progress_callback=progress_forwarder()
         )
-        
-        # Format result
-        output = f"# Result from {function_name}\n\n"
-        output += "```json\n"
-        output += json.dumps(result, indent=2)
-        output += "\n```"
-        
-        return [TextContent(type="text", text=output)]
-        
     except Exception as e:
         return [TextContent(
             type="text",
@@ -265,64 +618,290 @@ async def execute_function(arguments: dict) -> list[TextContent]:
                  f"Parameters: {json.dumps(parameters, indent=2)}"
         )]
 
+    # Relay the downstream content blocks as they are; only oversized text is paged
+    content, rest = paginate(result.content, budget)
+    if rest:
+        content.append(page_notice(rest))
+        structured = None  # usually mirrors the text that was just cut
+    else:
+        structured = result.structuredContent
+    if not content and structured is not None:
+        content = [TextContent(type="text", text=json.dumps(structured))]
+    return types.CallToolResult(content=content, structuredContent=structured, isError=result.isError)
 
-# Helper functions (stubs to be implemented)
 
-async def query_mcp_server_tools(command: list[str]) -> list[dict]:
+async def execute_many(arguments: dict) -> list:
     """
-    Start an MCP server and query its available tools
-    
-    TODO: Implement actual MCP client connection via stdio
+    Run execute_function calls concurrently, at most MAX_PARALLEL_CALLS at a
+    time across the server. Every call gets its own section in the output,
+    so one failure or timeout does not hide the other results; the page
+    budget is shared out between the calls.
     """
-    # This will:
-    # 1. Start subprocess pith command
-    # 2. Connect via MCP stdio protocol
-    # 3. Send initialize request
-    # 4. Send tools/list request
-    # 5. Return tools
-    
-    return [
-        {
-            "name": "example_tool",
-            "description": "This is a placeholder - actual implementation needed",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "param": {"type": "string"}
-                }
-            }
-        }
-    ]
+    calls = arguments.get("calls") or []
+    if not calls:
+        return [TextContent(type="text", text="Error: 'calls' must be a non-empty list")]
+    default_timeout = float(arguments.get("timeout", CALL_TIMEOUT))
+    budget = max(1000, RESULT_PAGE_CHARS // len(calls))
+
+    async def run(call: dict):
+        timeout = float(call.get("timeout", default_timeout))
+        try:
+            async with call_slots:
+                return await asyncio.wait_for(execute_function(call, budget), timeout)
+        except asyncio.TimeoutError:
+            return [TextContent(type="text", text=f"Error: timed out after {timeout:g}s")]
+        except Exception as e:
+            return [TextContent(type="text", text=f"Error: {str(e)}")]
+
+    results = await asyncio.gather(*(run(call) for call in calls))
+
+    content = []
+    n_failed = 0
+    for i, (call, result) in enumerate(zip(calls, results)):
+        blocks = result.content if isinstance(result, types.CallToolResult) else result
+        status = "error" if failed(result) else "ok"
+        n_failed += status == "error"
+        one_liner = " ".join((call.get("config") or {}).get("one_liner", []))
+        content.append(TextContent(type="text", text=f"## [{i}] {call.get('function_name')} on {one_liner}: {status}\n"))
+        content.extend(blocks)
+    content.insert(0, TextContent(
+        type="text",
+        text=f"# {len(calls) - n_failed} of {len(calls)} calls succeeded\n"
+    ))
+    return content
+
+
+async def read_result(arguments: dict) -> list:
+    """Next page of an oversized execute_function result"""
+    rest = result_pages.get(arguments["cursor"])
+    if rest is None:
+        return [TextContent(
+            type="text",
+            text="Error: unknown or expired cursor. Call execute_function again."
+        )]
+    content, rest = paginate(rest)
+    if rest:
+        content.append(page_notice(rest))
+    return content
+
+
+# Helper functions
+
+def block_size(block) -> int:
+    """Characters a content block adds to the payload: its text, or its serialized JSON (base64 blobs included)"""
+    if block.type == "text":
+        return len(block.text)
+    return len(block.model_dump_json(exclude_none=True))
+
+
+def paginate(blocks: list, budget: int = RESULT_PAGE_CHARS) -> tuple[list, list]:
+    """
+    Split content blocks into a page of at most budget characters and the
+    rest. A text block that straddles the boundary is cut, at a newline when
+    one is close. Other blocks (images, resources) count their serialized size
+    and are never cut: one that does not fit starts the next page, and one
+    larger than budget gets a page of its own.
+    """
+    page, used = [], 0
+    for i, block in enumerate(blocks):
+        room = budget - used
+        if room <= 0:
+            return page, list(blocks[i:])
+        size = block_size(block)
+        if block.type == "text":
+            if size > room:
+                cut = block.text.rfind("\n", room * 9 // 10, room) + 1 or room
+                if cut:
+                    page.append(TextContent(type="text", text=block.text[:cut]))
+                return page, [TextContent(type="text", text=block.text[cut:])] + list(blocks[i + 1:])
+        elif size > room and page:
+            return page, list(blocks[i:])
+        used += size
+        page.append(block)
+    return page, []
+
+
+def page_notice(rest: list) -> TextContent:
+    """Park the unread blocks and tell the model how to fetch them"""
+    cursor = uuid.uuid4().hex
+    result_pages.put(cursor, rest)
+    remaining = sum(block_size(b) for b in rest)
+    return TextContent(
+        type="text",
+        text=f"\n[Result truncated: {remaining} more characters in {len(rest)} block(s). "
+             f"Call read_result with cursor \"{cursor}\" for the next page.]"
+    )
+
+
+def progress_forwarder():
+    """
+    A progress callback relaying a downstream tool's progress notifications
+    to our own client, or None when the client did not ask for progress.
+    """
+    try:
+        ctx = app.request_context
+    except LookupError:
+        return None
+    token = ctx.meta.progressToken if ctx.meta else None
+    if token is None:
+        return None
+
+    async def forward(progress: float, total: float | None, message: str | None):
+        await ctx.session.send_progress_notification(
+            token, progress, total, message, related_request_id=str(ctx.request_id)
+        )
+    return forward
+
+
+async def query_mcp_server_tools(command: list[str], env_vars: dict | None = None) -> list[dict]:
+    """
+    Tools of an MCP server, from the on-disk tool cache when possible.
+    Stale entries are returned immediately and refreshed in the background.
+    """
+    cached = tool_cache.get(command)
+    CACHE_LOOKUPS.inc(cache="tools", result="miss" if not cached else ("hit" if cached[1] else "stale"))
+    if cached:
+        tools, fresh = cached
+        if not fresh:
+            revalidate_tools(command, env_vars)
+        return tools
+
+    tools = await fetch_mcp_server_tools(command, env_vars)
+    tool_cache.put(command, tools)
+    return tools
+
+
+async def tools_view(command: list[str], env_vars: dict | None = None) -> tool_view.ToolView:
+    """
+    The parsed, render-cached view of a server's tools. Views are keyed by
+    the tool cache entry's version, so a cached view skips decoding the
+    tool list entirely; staleness is still checked against the version.
+    """
+    key = cache_key(command)
+    version = tool_cache.version(command)
+    view = tool_view.get((key, version)) if version else None
+    if view is not None:
+        fresh = time.time() - version < tool_cache.ttl
+        CACHE_LOOKUPS.inc(cache="tools", result="hit" if fresh else "stale")
+        if not fresh:
+            revalidate_tools(command, env_vars)
+        return view
+
+    tools = await query_mcp_server_tools(command, env_vars)
+    return tool_view.view((key, tool_cache.version(command)), tools)
+
+
+async def fetch_mcp_server_tools(command: list[str], env_vars: dict | None = None, speculative: bool = False) -> list[dict]:
+    """
+    Query the available tools of an MCP server via a pooled stdio session
+    """
+    with timer(STAGE_SECONDS, stage="server_list_tools"):
+        async with pool.session(command, env_vars, speculative) as session:
+            result = await session.list_tools()
+    return [tool.model_dump(exclude_none=True) for tool in result.tools]
+
+
+_revalidating: dict[str, asyncio.Task] = {}
+
+
+def revalidate_tools(command: list[str], env_vars: dict | None = None):
+    """Refresh a stale tool cache entry without blocking the caller"""
+    key = cache_key(command)
+    if key in _revalidating:
+        return
+
+    async def refresh():
+        try:
+            tool_cache.put(command, await fetch_mcp_server_tools(command, env_vars))
+        except Exception as e:
+            print(f"revalidating {' '.join(command)} failed: {e}", file=sys.stderr)
+        finally:
+            _revalidating.pop(key, None)
+
+    _revalidating[key] = asyncio.create_task(refresh())
+
+
+_speculative: dict[str, asyncio.Task] = {}
+
+
+def prewarm(results: list[dict]):
+    """
+    Start the servers behind the top search hits while the model is still
+    reading the results, and cache their tools, so the list_tools that
+    usually follows finds a warm server. Servers whose tools are already
+    cached are skipped, speculation never evicts a server for room, and
+    speculation on hits that dropped out of the latest search is cancelled.
+    Hits that require env vars are skipped too: the pool keys servers by
+    their env, so a warm server started without credentials would never be
+    reused by the real call.
+    """
+    if not PREWARM:
+        return
+    wanted = {}
+    for result in results:
+        command = result.get("one_liner")
+        if result.get("requires"):
+            continue
+        if command and not (tool_cache.get(command) or (None, False))[1]:
+            wanted[server_key(command)] = command
+
+    # The agent moved on
+    for key, task in list(_speculative.items()):
+        if key not in wanted:
+            del _speculative[key]
+            task.cancel()
+
+    for key, command in wanted.items():
+        if key in _speculative or key in pool.servers:
+            continue
+        if len(_speculative) >= PREWARM_MAX or len(pool.servers) + len(_speculative) >= pool.max_live:
+            break
+        _speculative[key] = asyncio.create_task(warm(key, command))
+
+
+async def warm(key: str, command: list[str]):
+    try:
+        tool_cache.put(command, await fetch_mcp_server_tools(command, speculative=True))
+        PREWARMS.inc(outcome="ok")
+    except asyncio.CancelledError:
+        PREWARMS.inc(outcome="cancelled")
+        raise
+    except Exception as e:
+        PREWARMS.inc(outcome="error")
+        print(f"prewarming {' '.join(command)} failed: {e}", file=sys.stderr)
+    finally:
+        if _speculative.get(key) is asyncio.current_task():
+            del _speculative[key]
 
 
 async def execute_mcp_function(
     command: list[str],
     function_name: str,
     parameters: dict,
-    env_vars: dict
-) -> dict:
+    env_vars: dict,
+    progress_callback=None
+) -> types.CallToolResult:
     """
-    Execute a function on an MCP server
-    
-    TODO: Implement actual MCP client connection and tool execution
+    Execute a function on an MCP server via a pooled stdio session
     """
-    
-    return {
-        "status": "success",
-        "result": "This is a placeholder - actual implementation needed",
-        "function": function_name,
-        "parameters": parameters
-    }
+    with timer(STAGE_SECONDS, stage="server_call_tool"):
+        async with pool.session(command, env_vars) as session:
+            return await session.call_tool(function_name, parameters, progress_callback=progress_callback)
 
 
 async def main():
     """Run the InfiniteMCP server"""
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        )
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(
+                read_stream,
+                write_stream,
+                app.create_initialization_options()
+            )
+    finally:
+        await pool.close_all()
+        if _http_client is not None:
+            await _http_client.aclose()
 
 
 if __name__ == "__main__":
@@ -1,50 +1,52 @@
-#!/usr/bin/env python3 
+#!/usr/bin/env python3
+#
+# Reads README paths on stdin and indexes them into ./chroma_db.
+#
+# Runs are incremental: only repos whose README changed are re-embedded,
+# sidecar-only changes update metadata in place, and repos missing from the
+# input are deleted from the index. --full rebuilds from scratch,
+# --keep-missing skips the deletion pass (for partial inputs).
 from tqdm import tqdm
 from pathlib import Path
+from manifest import Manifest, doc_hashes, UNCHANGED, METADATA
+from pipeline import read_ahead, Writer, StageStats, detect_encoding
+from ranking import meta_features
+from batching import token_lengths, token_batches, padded_tokens, encode_bucketed, BudgetController
 import chromadb
+import json
 import os
 import sys
 import torch
 import magic
 import html2text
 import chardet
-import signal
 import re
+import time
 import spacy
 import common
 from sentence_transformers import SentenceTransformer
 
-model = common.model
+FULL = '--full' in sys.argv
+KEEP_MISSING = '--keep-missing' in sys.argv
+
 client = chromadb.PersistentClient(path="./chroma_db")
+if FULL:
+  try:
+    client.delete_collection(name="documents")
+  except Exception:
+    pass
 collection = client.get_or_create_collection(name="documents")
-BATCH_SIZE = 8
-
-def detect_encoding(file_path):
-      with open(file_path, 'rb') as f:
-          raw_data = f.read()
-      result = chardet.detect(raw_data)
-      return result['encoding']
-
-def move_batch(amount):
-    global BATCH_SIZE
-    BATCH_SIZE += amount
-    BATCH_SIZE = max(1, BATCH_SIZE)
-    print(f"\n*** New batch size {BATCH_SIZE}", flush=True)
-
-def _increase_batch(signum, frame):
-    move_batch(1)
-
-def _decrease_batch(signum, frame):
-    move_batch(-1)
-
-signal.signal(signal.SIGUSR1, _increase_batch)
-signal.signal(signal.SIGUSR2, _decrease_batch)
-
-counter = 0
+manifest = Manifest("./chroma_db/manifest.sqlite")
+if FULL:
+  manifest.clear()
+WINDOW = int(os.environ.get('INGEST_WINDOW', 64))
+# Created on the first window that needs encoding, so a run where nothing
+# changed (or only metadata did) never loads the model or probes the device
+controller = None
 
 def reader(config):
   lines = []
-  encoding = detect_encoding(config) 
+  encoding = detect_encoding(config)
   with open(config, 'r', encoding=encoding, errors='replace') as f:
     lines = []
     for what in f.readlines():
@@ -63,96 +65,153 @@ def getter(fp, path):
 
   return config
 
-i = -1 
-while True:
-    texts = []
-    configs = []
-    onelines = []
-    valid_paths = []
-    metas = []
-    while len(valid_paths) < BATCH_SIZE:
-        i += 1
-        sys.stdout.write('.')
-        sys.stdout.flush()
-        fp = sys.stdin.readline().strip()
-        if not os.path.isfile(fp):
-            sys.exit(0)
-
-        try:
-            meta = getter(fp, "_meta-info.json")
-            if not meta:
-              continue
-
-            config = getter(fp, "_mcp-config.json")
-            if not config:
-              continue
-
-            oneline = getter(fp, "_one-liner.json")
-            if not oneline:
-              continue
-            try_one = reader(oneline)
-            if 'npx' in try_one:
-              if '@' not in try_one:
-                continue
-            elif 'your' in try_one and 'program' in try_one:
-              continue
-            elif 'uvx' in try_one:
-              print(try_one)
-            else:
-              continue
-
-            configs.append(reader(config))
-            onelines.append(try_one)
-            metas.append(reader(meta))
-
-            encoding = detect_encoding(fp) 
-            with open(fp, 'r', encoding=encoding, errors='replace') as f:
-                processed_text = f.read()
-                texts.append(processed_text)
-            valid_paths.append(str(fp))
-        except Exception as e:
-          print(f"{fp} => {e}")
-    
-    if len(texts) == 0:
-        break
-
-    try:
-      with torch.no_grad():
-          embeddings = model.encode(
-              texts, 
-              show_progress_bar=False,
-              batch_size=len(texts),
-              convert_to_numpy=True
-          )
-      
-      torch.cuda.empty_cache()
-      
-      meta = []
-      stubs = []
-      for i in range(len(valid_paths)):
-        stub = "/".join(valid_paths[i].split("/")[-3:-1])
-        stubs.append(stub)
-        meta.append({'file_path': stub, 'meta': metas[i], 'config': configs[i], 'oneline': onelines[i] })
-
-      try:
-        collection.add(
-            embeddings=embeddings.tolist(),
-            documents=texts,
-            ids=[j.replace('/', '_') for j in stubs],
-            metadatas=meta
-        )
-      except:
-        pass
-      torch.cuda.empty_cache()
-      counter += 1
-
-      if counter > 25:
-        move_batch(1)
-        counter = 0
-
-    except RuntimeError as e:
-      i -= BATCH_SIZE
-      move_batch(-1)
-      counter = 0
+def load_doc(fp):
+  """The stub, id, metadata and hashes of a README, or None when it isn't indexable"""
+  meta = getter(fp, "_meta-info.json")
+  if not meta:
+    return
+
+  config = getter(fp, "_mcp-config.json")
+  if not config:
+    return
+
+  oneline = getter(fp, "_one-liner.json")
+  if not oneline:
+    return
+  try_one = reader(oneline)
+  if 'npx' in try_one:
+    if '@' not in try_one:
+      return
+  elif 'your' in try_one and 'program' in try_one:
+    return
+  elif 'uvx' in try_one:
+    print(try_one)
+  else:
+    return
+
+  stub = "/".join(fp.split("/")[-3:-1])
+  meta_text = reader(meta)
+  try:
+    features = meta_features(meta_text)
+  except Exception:
+    features = {'stars': 0, 'forks': 0, 'pushed_at': 0.0, 'archived': False}
+  return {
+    'path': fp,
+    'stub': stub,
+    'id': stub.replace('/', '_'),
+    'hashes': doc_hashes(fp),
+    'metadata': {'file_path': stub, 'meta': meta_text, 'config': reader(config), 'oneline': try_one, **features, **oneline_features(try_one) }
+  }
+
+def oneline_features(try_one):
+  """Filter columns from the one-liner: its runner and how many env vars it requires (-1 if unparseable)"""
+  runner = 'npx' if 'npx' in try_one else 'uvx'
+  try:
+    parsed = json.loads(try_one)
+    command = parsed.get('one_liner') or []
+    if command and os.path.basename(command[0]) in ('npx', 'uvx'):
+      runner = os.path.basename(command[0])
+    return {'runner': runner, 'n_requires': len(parsed.get('requires') or [])}
+  except Exception:
+    return {'runner': runner, 'n_requires': -1}
+
+def read_text(fp):
+  encoding = detect_encoding(fp)
+  with open(fp, 'r', encoding=encoding, errors='replace') as f:
+    return f.read()
+
+def prepare(fp):
+  """Reader stage: load, filter and classify one README against the manifest"""
+  if not os.path.isfile(fp):
+    return
+  doc = load_doc(fp)
+  if not doc:
+    return
+  doc['change'] = manifest.change(doc['stub'], doc['hashes'])
+  if doc['change'] not in (UNCHANGED, METADATA):
+    doc['text'] = read_text(fp)
+  return doc
+
+def update_metadata(doc):
+  collection.update(ids=[doc['id']], metadatas=[doc['metadata']])
+  manifest.put_many([(doc['stub'], doc['hashes'])])
+
+def write_batch(docs, embeddings):
+  collection.upsert(
+      embeddings=embeddings.tolist(),
+      documents=[doc['text'] for doc in docs],
+      ids=[doc['id'] for doc in docs],
+      metadatas=[doc['metadata'] for doc in docs]
+  )
+  # Only record what actually made it into the index, so a crash or a
+  # failed write is picked up again by the next run
+  manifest.put_many([(doc['stub'], doc['hashes']) for doc in docs])
+
+read_stats = StageStats("read")
+encode_stats = StageStats("encode")
+write_stats = StageStats("write")
+writer = Writer(write_stats)
+started = time.perf_counter()
+
+tokens = 0
+padded = 0
+windows = 0
+
+def report():
+  wall = time.perf_counter() - started
+  waste = 1 - tokens / padded if padded else 0.0
+  print(" | ".join(s.report(wall) for s in (read_stats, encode_stats, write_stats)) + f" | padding {100 * waste:.0f}%", file=sys.stderr, flush=True)
+
+def encode(docs):
+  """Encode a window of docs in length-bucketed batches and write them in arrival order"""
+  global tokens, padded, windows, controller
+  model = common.get_model()
+  if controller is None:
+    controller = BudgetController()
+  texts = [doc['text'] for doc in docs]
+  lengths = token_lengths(model, texts)
+  with torch.no_grad(), encode_stats.timed(len(docs)):
+      embeddings, failed = encode_bucketed(model, texts, controller, lengths)
+  torch.cuda.empty_cache()
+
+  # Docs that could not be encoded stay out of the manifest and are retried next run
+  if failed:
+    keep = [i for i in range(len(docs)) if i not in set(failed)]
+    docs = [docs[i] for i in keep]
+    embeddings = embeddings[keep]
+  if docs:
+    writer.submit(len(docs), write_batch, docs, embeddings)
+
+  tokens += sum(lengths)
+  padded += padded_tokens(lengths, token_batches(lengths, controller.budget))
+  windows += 1
+  if windows % 10 == 0:
+    report()
+
+seen = set()
+docs = []
+paths = (line.strip() for line in sys.stdin)
+for doc in read_ahead(prepare, paths, read_stats):
+    seen.add(doc['stub'])
+    if doc['change'] == UNCHANGED:
+      continue
+    if doc['change'] == METADATA:
+      writer.submit(1, update_metadata, doc)
       continue
 
+    docs.append(doc)
+    if len(docs) >= WINDOW:
+      encode(docs)
+      docs = []
+
+if docs:
+  encode(docs)
+writer.close()
+report()
+
+if not KEEP_MISSING:
+  gone = sorted(manifest.stubs() - seen)
+  if gone:
+    print(f"\nremoving {len(gone)} repos no longer in the crawl")
+    collection.delete(ids=[stub.replace('/', '_') for stub in gone])
+    manifest.delete_many(gone)
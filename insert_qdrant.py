@@ -3,36 +3,61 @@ from tqdm import tqdm
 from pathlib import Path
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct, SparseVector, SparseVectorParams
+from qdrant_client.models import ScalarQuantization, ScalarQuantizationConfig, ScalarType, BinaryQuantization, BinaryQuantizationConfig
 import os
 import sys
 import torch
 import magic
 import html2text
 import chardet
-import signal
 import re
 import spacy
 from sentence_transformers import SentenceTransformer
-from collections import Counter
 import numpy as np
 import common
+from batching import encode_bucketed, BudgetController
+from sparse import BM25Encoder
+import uuid
 
 model = common.model
 
 # Initialize Qdrant client
 client = QdrantClient(path="./qdrant_db")
 
+# Compressed first-pass search: QDRANT_QUANTIZATION=int8|binary keeps a
+# quantized copy in RAM, QDRANT_DIMS adds a Matryoshka-truncated "dense_small"
+# vector. Either way the full-precision "dense" vectors move to disk and are
+# only read to rescore candidates (see query.py).
+QUANTIZATION = os.environ.get('QDRANT_QUANTIZATION', 'none')
+DIMS = int(os.environ['QDRANT_DIMS']) if os.environ.get('QDRANT_DIMS') else None
+
+quantization_config = None
+if QUANTIZATION == 'int8':
+    quantization_config = ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8, always_ram=True))
+elif QUANTIZATION == 'binary':
+    quantization_config = BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+
+vectors_config = {
+    "dense": VectorParams(
+        size=model.get_sentence_embedding_dimension(), 
+        distance=Distance.COSINE,
+        on_disk=bool(quantization_config or DIMS),
+        quantization_config=None if DIMS else quantization_config
+    )
+}
+if DIMS:
+    vectors_config["dense_small"] = VectorParams(
+        size=DIMS,
+        distance=Distance.COSINE,
+        quantization_config=quantization_config
+    )
+
 # Create collection with both dense and sparse vectors
 collection_name = "documents"
 try:
     client.create_collection(
         collection_name=collection_name,
-        vectors_config={
-            "dense": VectorParams(
-                size=model.get_sentence_embedding_dimension(), 
-                distance=Distance.COSINE
-            )
-        },
+        vectors_config=vectors_config,
         sparse_vectors_config={
             "sparse": SparseVectorParams()
         }
@@ -40,7 +65,9 @@ try:
 except:
     pass  # Collection already exists
 
-BATCH_SIZE = 8
+WINDOW = int(os.environ.get('INGEST_WINDOW', 64))
+controller = BudgetController()
+bm25 = BM25Encoder("./qdrant_db/bm25.json")
 
 def detect_encoding(file_path):
     with open(file_path, 'rb') as f:
@@ -48,54 +75,25 @@ def detect_encoding(file_path):
     result = chardet.detect(raw_data)
     return result['encoding']
 
-def create_sparse_vector(text):
-    """Create a simple BM25-style sparse vector from text"""
-    # Tokenize and count
-    words = text.lower().split()
-    word_counts = Counter(words)
-    
-    # Create vocabulary mapping (simple hash)
-    indices = []
-    values = []
-    for word, count in word_counts.items():
-        # Use hash as index (Qdrant handles sparse vectors efficiently)
-        idx = hash(word) % (2**31)  # Keep it positive
-        indices.append(idx)
-        # Simple TF weighting (you could add IDF if you track document frequencies)
-        values.append(float(count))
-    
-    return SparseVector(indices=indices, values=values)
-
-def move_batch(amount):
-    global BATCH_SIZE
-    BATCH_SIZE += amount
-    BATCH_SIZE = max(1, BATCH_SIZE)
-    print(f"\n*** New batch size {BATCH_SIZE}", flush=True)
-
-def _increase_batch(signum, frame):
-    move_batch(1)
-
-def _decrease_batch(signum, frame):
-    move_batch(-1)
-
-signal.signal(signal.SIGUSR1, _increase_batch)
-signal.signal(signal.SIGUSR2, _decrease_batch)
-
-counter = 0
 WORD_LEN = 3500
 MIN_LEN = 2000
 i = -1 
 
-while True:
+eof = False
+while not eof:
     texts = []
     valid_paths = []
-    while len(valid_paths) < BATCH_SIZE:
+    while len(valid_paths) < WINDOW:
         i += 1
         sys.stdout.write('.')
         sys.stdout.flush()
-        fp = sys.stdin.readline().strip()
+        line = sys.stdin.readline()
+        if not line:
+            eof = True
+            break
+        fp = line.strip()
         if not os.path.isfile(fp):
-            sys.exit(0)
+            continue
         mime_type = magic.from_file(str(fp), mime=True)
         try:
             encoding = detect_encoding(fp) 
@@ -107,57 +105,56 @@ while True:
             print(f"{fp} => {e}")
     
     if len(texts) == 0:
-        break
+        continue
     
-    try:
-        with torch.no_grad():
-            embeddings = model.encode(
-                texts, 
-                show_progress_bar=False,
-                batch_size=len(texts),
-                convert_to_numpy=True
-            )
-        
-        torch.cuda.empty_cache()
-        
-        stubs = ["/".join(fp.split("/")[-3:]) for fp in valid_paths]  # Fixed slice
-        
-        # Prepare points for Qdrant
-        points = []
-        for idx, (embedding, text, stub) in enumerate(zip(embeddings, texts, stubs)):
-            point_id = hash(stub) % (2**63)  # Generate unique ID
-            
-            points.append(
-                PointStruct(
-                    id=point_id,
-                    vector={
-                        "dense": embedding.tolist(),
-                        "sparse": create_sparse_vector(text)
-                    },
-                    payload={
-                        "file_path": stub,
-                        "text": text  # Store full text in payload
-                    }
-                )
-            )
+    # Length-bucketed batches under the token budget, back in arrival order.
+    # Out-of-memory batches are split and retried inside encode_bucketed.
+    with torch.no_grad():
+        embeddings, failed = encode_bucketed(model, texts, controller)
+    
+    torch.cuda.empty_cache()
+    
+    stubs = ["/".join(fp.split("/")[-3:]) for fp in valid_paths]  # Fixed slice
+    
+    for idx in failed:
+        print(f"skipping {stubs[idx]}, too long to encode")
+    keep = [idx for idx in range(len(texts)) if idx not in failed]
+    # uuid5 is stable across runs, unlike the per-process salted hash()
+    point_ids = {idx: str(uuid.uuid5(uuid.NAMESPACE_URL, stubs[idx])) for idx in keep}
+    sparse = dict(zip(keep, bm25.encode_documents([(point_ids[idx], texts[idx]) for idx in keep])))
+    
+    # Prepare points for Qdrant
+    points = []
+    for idx in keep:
+        embedding, text, stub, point_id = embeddings[idx], texts[idx], stubs[idx], point_ids[idx]
+        indices, values = sparse[idx]
+        vector = {
+            "dense": embedding.tolist(),
+            "sparse": SparseVector(indices=indices, values=values)
+        }
+        if DIMS:
+            vector["dense_small"] = embedding[:DIMS].tolist()
         
-        try:
-            client.upsert(
-                collection_name=collection_name,
-                points=points
+        points.append(
+            PointStruct(
+                id=point_id,
+                vector=vector,
+                payload={
+                    "file_path": stub,
+                    "text": text  # Store full text in payload
+                }
             )
-        except Exception as e:
-            print(f"Error upserting: {e}")
-            pass
-        
-        torch.cuda.empty_cache()
-        counter += 1
-        if counter > 25:
-            move_batch(1)
-            counter = 0
-            
-    except RuntimeError as e:
-        i -= BATCH_SIZE
-        move_batch(-1)
-        counter = 0
-        continue
+        )
+    
+    try:
+        client.upsert(
+            collection_name=collection_name,
+            points=points
+        )
+        bm25.commit()
+        bm25.save()
+    except Exception as e:
+        bm25.discard()
+        print(f"Error upserting: {e}")
+    
+    torch.cuda.empty_cache()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+#
+# Indexes individual tools, one document per (server, tool), into the
+# "tools" collection of ./chroma_db, so search_tools can go from a task
+# straight to a function without spawning servers.
+#
+# Tools come from the tools/list cache (fill it with ./tool_cache.py prefill),
+# server configs and popularity from the gh/ crawl:
+#
+#   ./insert_tools.py [gh] [--full]
+#
+# Runs are incremental: only tools whose text changed are re-embedded and
+# tools that disappeared are deleted. --full rebuilds from scratch.
+from pathlib import Path
+from ranking import meta_features
+from tool_cache import tool_cache, cache_key
+from batching import encode_bucketed, BudgetController
+import chromadb
+import hashlib
+import json
+import os
+import sys
+import torch
+import common
+
+FULL = '--full' in sys.argv
+ROOT = next((a for a in sys.argv[1:] if not a.startswith('--')), 'gh')
+WINDOW = int(os.environ.get('INGEST_WINDOW', 64))
+MAX_PARAMS = 20
+
+client = chromadb.PersistentClient(path="./chroma_db")
+if FULL:
+  try:
+    client.delete_collection(name="tools")
+  except Exception:
+    pass
+collection = client.get_or_create_collection(name="tools")
+
+def servers(root):
+  """cache_key(one_liner) -> server stub, one_liner config and filter/ranking columns"""
+  out = {}
+  for path in sorted(Path(root).glob("*/*/_one-liner.json")):
+    try:
+      parsed = json.loads(path.read_text(errors='replace'))
+      command = parsed.get('one_liner')
+    except Exception:
+      continue
+    if not isinstance(command, list) or not command or not all(isinstance(c, str) for c in command):
+      continue
+    requires = parsed.get('requires') or []
+    try:
+      features = meta_features((path.parent / "_meta-info.json").read_text(errors='replace'))
+    except Exception:
+      features = {'stars': 0, 'forks': 0, 'pushed_at': 0.0, 'archived': False}
+    runner = os.path.basename(command[0])
+    out[cache_key(command)] = {
+      'server': "/".join(path.parts[-3:-1]),
+      'oneline': json.dumps({'one_liner': command, 'requires': requires}),
+      'runner': runner if runner in ('npx', 'uvx') else '',
+      'n_requires': len(requires),
+      **features
+    }
+  return out
+
+def tool_text(server, tool):
+  """What gets embedded: the tool's name, description and parameters"""
+  lines = [f"{tool['name']}: {tool.get('description') or ''}".strip()]
+  props = (tool.get('inputSchema') or {}).get('properties') or {}
+  for name, prop in list(props.items())[:MAX_PARAMS]:
+    prop = prop if isinstance(prop, dict) else {}
+    line = f"- {name} ({prop.get('type', 'any')})"
+    if prop.get('description'):
+      line += f": {prop['description']}"
+    lines.append(line)
+  lines.append(f"server: {server}")
+  return "\n".join(lines)
+
+known = servers(ROOT)
+docs = {}
+for command, tools in tool_cache.commands():
+  server = known.get(cache_key(command))
+  if not server:
+    continue
+  for tool in tools:
+    if not tool.get('name'):
+      continue
+    text = tool_text(server['server'], tool)
+    doc_id = f"{server['server']}#{tool['name']}"
+    docs[doc_id] = {
+      'text': text,
+      'metadata': {
+        **server,
+        'tool': tool['name'],
+        'description': tool.get('description') or '',
+        'schema': json.dumps(tool.get('inputSchema') or {}, separators=(',', ':')),
+        'text_hash': hashlib.sha256(text.encode()).hexdigest()
+      }
+    }
+
+existing = collection.get(include=["metadatas"])
+indexed = {i: m.get('text_hash') for i, m in zip(existing['ids'], existing['metadatas'])}
+todo = [i for i, doc in docs.items() if indexed.get(i) != doc['metadata']['text_hash']]
+gone = sorted(set(indexed) - set(docs))
+print(f"{len(docs)} tools from {len(known)} servers: {len(todo)} to embed, {len(gone)} to remove", file=sys.stderr)
+
+if gone:
+  collection.delete(ids=gone)
+if not todo:
+  # Nothing to embed: don't probe GPU memory or load the model
+  sys.exit(0)
+
+controller = BudgetController()
+model = common.get_model()
+for start in range(0, len(todo), WINDOW):
+  ids = todo[start:start + WINDOW]
+  texts = [docs[i]['text'] for i in ids]
+  with torch.no_grad():
+    embeddings, failed = encode_bucketed(model, texts, controller)
+  keep = [j for j in range(len(ids)) if j not in set(failed)]
+  if keep:
+    collection.upsert(
+      ids=[ids[j] for j in keep],
+      embeddings=embeddings[keep].tolist(),
+      documents=[texts[j] for j in keep],
+      metadatas=[docs[ids[j]]['metadata'] for j in keep]
+    )
+  print(f"{min(start + WINDOW, len(todo))}/{len(todo)}", file=sys.stderr)
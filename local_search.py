@@ -0,0 +1,143 @@
+"""
+In-process search backend over an index written by export_index.py.
+
+The embedding matrix is memory-mapped float16 and scored by a blocked dot
+product, so search needs no chroma and no network hop. Distances are squared
+L2 between unit vectors, the same scale chroma reports, so the rerank
+behaves the same as on the search server.
+
+When the export has a compressed first-pass matrix (see quantize.py), it is
+scanned instead and only the RESCORE_OVERSAMPLE x n_results best candidates
+are rescored against the full-precision rows.
+"""
+
+from pathlib import Path
+from ranking import rerank, format_results, format_tool_results, RERANK_POOL
+from quantize import truncate, prepare, scores
+from filters import mask
+import numpy as np
+import json
+import os
+import threading
+
+LOCAL_INDEX_PATH = os.environ.get("INFINITEMCP_INDEX", "index")
+TOOLS_INDEX_PATH = os.environ.get("INFINITEMCP_TOOLS_INDEX", "index-tools")
+BLOCK_ROWS = 8192
+RESCORE_OVERSAMPLE = int(os.environ.get("INFINITEMCP_RESCORE_OVERSAMPLE", 4))
+
+
+class LocalIndex:
+    def __init__(self, path: str = LOCAL_INDEX_PATH):
+        path = Path(path)
+        self.embeddings = np.load(path / "embeddings.npy", mmap_mode="r")
+        with open(path / "meta.json") as f:
+            table = json.load(f)
+        self.ids = table["ids"]
+        self.metadatas = table["metadatas"]
+
+        # Filter columns, see filters.py
+        self.columns = {
+            "runner": np.array([m.get("runner", "") for m in self.metadatas]),
+            "n_requires": np.array([m.get("n_requires", -1) for m in self.metadatas]),
+            "archived": np.array([bool(m.get("archived", False)) for m in self.metadatas]),
+            "stars": np.array([m.get("stars", 0) for m in self.metadatas])
+        }
+
+        self.first_pass = table.get("first_pass")
+        if self.first_pass:
+            self.codes = prepare(np.load(path / "first_pass.npy"), self.first_pass["quantization"])
+            self.scales = np.load(path / "scales.npy") if self.first_pass["quantization"] == "int8" else None
+
+    def full_scores(self, q: np.ndarray, rows: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """(similarities, row numbers) of q against every row, or against just rows"""
+        if rows is not None:
+            # Sorted row order keeps the reads from the memory map sequential
+            rows = np.sort(rows)
+            return self.embeddings[rows].astype(np.float32) @ q, rows
+        out = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(out), BLOCK_ROWS):
+            block = self.embeddings[start:start + BLOCK_ROWS]
+            out[start:start + len(block)] = block.astype(np.float32) @ q
+        return out, np.arange(len(out))
+
+    def query(self, query_embedding, n_results: int = RERANK_POOL, filters: dict | None = None) -> tuple[list, list, list]:
+        """ids, distances, metadatas of the n_results nearest rows matching filters"""
+        q = np.asarray(query_embedding, dtype=np.float32).ravel()
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        keep = mask(self.columns, filters or {})
+        if keep is not None:
+            n_results = min(n_results, int(keep.sum()))
+
+        rows = None
+        if self.first_pass:
+            approx = scores(self.codes, self.scales, truncate(q, self.first_pass["dims"]), self.first_pass["quantization"])
+            if keep is not None:
+                approx[~keep] = -np.inf
+            rows = top_k(approx, n_results * RESCORE_OVERSAMPLE)
+        elif keep is not None:
+            rows = np.flatnonzero(keep)
+        sims, rows = self.full_scores(q, rows)
+        if keep is not None:
+            sims[~keep[rows]] = -np.inf
+
+        top = top_k(sims, n_results)
+        distances = 2.0 - 2.0 * sims[top]
+        return (
+            [self.ids[rows[i]] for i in top],
+            distances.tolist(),
+            [self.metadatas[rows[i]] for i in top]
+        )
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+_indexes: dict[str, LocalIndex] = {}
+_lock = threading.Lock()
+
+
+def get_index(path: str = LOCAL_INDEX_PATH) -> LocalIndex:
+    with _lock:
+        if path not in _indexes:
+            _indexes[path] = LocalIndex(path)
+    return _indexes[path]
+
+
+def search(query_text: str, limit: int = 3, filters: dict | None = None) -> dict:
+    """Same response shape as the /search endpoint of query_chroma_server.py"""
+    import common
+
+    index = get_index()
+    n_results = max(RERANK_POOL, limit)
+    ids, distances, metadatas = index.query(common.get_model().encode(query_text), n_results, filters)
+    return {"results": format_results(rerank(ids, distances, metadatas, limit=n_results))[:limit]}
+
+
+def search_many(requests: list[tuple[str, int, dict | None]]) -> list[dict]:
+    """search() for many (query_text, limit, filters) at once, with one encode call"""
+    import common
+
+    index = get_index()
+    embeddings = common.get_model().encode([r[0] for r in requests])
+    out = []
+    for embedding, (_, limit, filters) in zip(embeddings, requests):
+        n_results = max(RERANK_POOL, limit)
+        ids, distances, metadatas = index.query(embedding, n_results, filters)
+        out.append({"results": format_results(rerank(ids, distances, metadatas, limit=n_results))[:limit]})
+    return out
+
+
+def search_tools(query_text: str, limit: int = 5, filters: dict | None = None) -> dict:
+    """Same response shape as the /search/tools endpoint of query_chroma_server.py"""
+    import common
+
+    index = get_index(TOOLS_INDEX_PATH)
+    n_results = max(RERANK_POOL, limit)
+    ids, distances, metadatas = index.query(common.get_model().encode(query_text), n_results, filters)
+    return {"results": format_tool_results(rerank(ids, distances, metadatas, limit=n_results))[:limit]}
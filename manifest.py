@@ -0,0 +1,88 @@
+"""
+Ingestion manifest: what is in the index, keyed by repo stub.
+
+For every indexed repo we keep the hashes of its README and sidecar files, so
+a refresh can tell unchanged repos (skip), metadata-only changes (update
+metadata without re-encoding) and content changes (re-embed) apart, and can
+delete repos that vanished from the crawl. Rows are committed right after the
+index write they describe, so the manifest doubles as a crash checkpoint.
+"""
+
+from pathlib import Path
+import hashlib
+import os
+import sqlite3
+import threading
+
+SIDECARS = ("_one-liner.json", "_mcp-config.json", "_meta-info.json")
+
+UNCHANGED = "unchanged"
+METADATA = "metadata"
+CONTENT = "content"
+
+
+def file_hash(path) -> str | None:
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def doc_hashes(readme) -> dict:
+    """Hashes of a README and the sidecar files next to it"""
+    base = Path(os.path.dirname(readme))
+    hashes = {"readme": file_hash(readme)}
+    for name in SIDECARS:
+        hashes[name] = file_hash(base / name)
+    return hashes
+
+
+class Manifest:
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS docs (
+                stub TEXT PRIMARY KEY,
+                readme TEXT,
+                one_liner TEXT,
+                mcp_config TEXT,
+                meta_info TEXT
+            )
+        """)
+        self.db.commit()
+
+    def change(self, stub: str, hashes: dict) -> str:
+        """How a doc differs from what was indexed: UNCHANGED, METADATA or CONTENT"""
+        with self._lock:
+            row = self.db.execute(
+                "SELECT readme, one_liner, mcp_config, meta_info FROM docs WHERE stub = ?", (stub,)
+            ).fetchone()
+        if row is None or row[0] != hashes["readme"]:
+            return CONTENT
+        if tuple(row[1:]) != tuple(hashes[name] for name in SIDECARS):
+            return METADATA
+        return UNCHANGED
+
+    def put_many(self, entries: list[tuple[str, dict]]):
+        with self._lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO docs (stub, readme, one_liner, mcp_config, meta_info) VALUES (?, ?, ?, ?, ?)",
+                [(stub, hashes["readme"], *(hashes[name] for name in SIDECARS)) for stub, hashes in entries]
+            )
+            self.db.commit()
+
+    def delete_many(self, stubs: list[str]):
+        with self._lock:
+            self.db.executemany("DELETE FROM docs WHERE stub = ?", [(s,) for s in stubs])
+            self.db.commit()
+
+    def stubs(self) -> set[str]:
+        with self._lock:
+            return {row[0] for row in self.db.execute("SELECT stub FROM docs")}
+
+    def clear(self):
+        with self._lock:
+            self.db.execute("DELETE FROM docs")
+            self.db.commit()
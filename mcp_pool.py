@@ -0,0 +1,249 @@
+"""
+Warm pool of stdio MCP client sessions.
+
+Spawning an `npx`/`uvx` server and running `initialize` costs seconds, so
+sessions are kept alive and reused across list_tools / execute_function
+calls. A server is keyed by its one_liner plus a hash of the env vars it was
+started with, and is evicted LRU-first when the pool is full or when it has
+been idle for longer than the idle timeout.
+"""
+
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from metrics import counter, gauge, histogram, timer
+import asyncio
+import hashlib
+import json
+import os
+import pkgstore
+import sys
+import time
+
+MAX_LIVE_SERVERS = int(os.environ.get("INFINITEMCP_MAX_SERVERS", 8))
+IDLE_TIMEOUT = float(os.environ.get("INFINITEMCP_IDLE_TIMEOUT", 300))
+
+SERVER_START = histogram("mcp_server_start_seconds", "Time to start a pooled MCP server, by phase", ["phase"])
+SERVER_SPAWNS = counter("mcp_server_spawns_total", "MCP server processes started, by outcome", ["outcome"])
+SERVER_EVICTIONS = counter("mcp_server_evictions_total", "Pooled MCP servers shut down, by reason", ["reason"])
+
+
+def server_key(command: list[str], env_vars: dict | None = None) -> str:
+    """one_liner + sha256 of the sorted env vars (values never leave the hash)"""
+    env_hash = hashlib.sha256(
+        json.dumps(sorted((env_vars or {}).items())).encode()
+    ).hexdigest()[:16]
+    return json.dumps(command) + "#" + env_hash
+
+
+class PooledServer:
+    """
+    One live server process and its initialized ClientSession.
+
+    The stdio transport and session are anyio context managers which must be
+    entered and exited from the same task, so each server owns a task that
+    holds them open until close() is called.
+    """
+
+    def __init__(self, key: str, command: list[str], env_vars: dict | None):
+        self.key = key
+        self.command = command
+        self.env_vars = env_vars or {}
+        self.session: ClientSession | None = None
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self.speculative = False  # started ahead of need and not used for real yet
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error: BaseException | None = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+        try:
+            await self._ready.wait()
+        except asyncio.CancelledError:
+            self._task.cancel()
+            raise
+        if self._error:
+            raise self._error
+
+    async def _run(self):
+        try:
+            # npx/uvx one_liners run from the package store when possible
+            command, store_env = await asyncio.to_thread(pkgstore.store.launch, self.command)
+            params = StdioServerParameters(
+                command=command[0],
+                args=command[1:],
+                env={**os.environ, **store_env, **self.env_vars}
+            )
+            started = time.perf_counter()
+            async with stdio_client(params) as (read_stream, write_stream):
+                SERVER_START.observe(time.perf_counter() - started, phase="spawn")
+                async with ClientSession(read_stream, write_stream) as session:
+                    with timer(SERVER_START, phase="initialize"):
+                        await session.initialize()
+                    SERVER_SPAWNS.inc(outcome="ok")
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        except BaseException as e:
+            if not self._ready.is_set():
+                SERVER_SPAWNS.inc(outcome="error")
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def close(self):
+        self._closing.set()
+        if self._task:
+            try:
+                await asyncio.wait_for(self._task, timeout=5)
+            except (asyncio.TimeoutError, Exception):
+                self._task.cancel()
+
+
+class ServerPool:
+    def __init__(self, max_live: int = MAX_LIVE_SERVERS, idle_timeout: float = IDLE_TIMEOUT):
+        self.max_live = max(1, max_live)
+        self.idle_timeout = idle_timeout
+        self.servers: OrderedDict[str, PooledServer] = OrderedDict()
+        self._starting: dict[str, asyncio.Task] = {}
+        self._waiters: dict[str, int] = {}
+        self._lock = asyncio.Lock()
+        self._reaper: asyncio.Task | None = None
+
+    @asynccontextmanager
+    async def session(self, command: list[str], env_vars: dict | None = None, speculative: bool = False):
+        """
+        Yield an initialized ClientSession for command, spawning it if needed.
+        A server that fails mid-call is dropped so the next call respawns it.
+        Speculative sessions mark a new server as first in line for eviction
+        until a regular session uses it.
+        """
+        server = await self._acquire(command, env_vars, speculative)
+        server.in_use += 1
+        if not speculative:
+            server.speculative = False
+        try:
+            yield server.session
+        except Exception:
+            if not server.alive:
+                await self._discard(server)
+            raise
+        finally:
+            server.in_use -= 1
+            server.last_used = time.monotonic()
+
+    async def _acquire(self, command: list[str], env_vars: dict | None, speculative: bool = False) -> PooledServer:
+        key = server_key(command, env_vars)
+        self._ensure_reaper()
+
+        async with self._lock:
+            server = self.servers.get(key)
+            if server and server.alive:
+                self.servers.move_to_end(key)
+                server.last_used = time.monotonic()
+                return server
+            if server:
+                del self.servers[key]
+
+            # Concurrent callers for the same key share one spawn
+            starting = self._starting.get(key)
+            if not starting:
+                starting = asyncio.create_task(self._spawn(key, command, env_vars, speculative))
+                self._starting[key] = starting
+            self._waiters[key] = self._waiters.get(key, 0) + 1
+
+        try:
+            return await asyncio.shield(starting)
+        except asyncio.CancelledError:
+            # Nobody else wants it: stop the spawn instead of finishing it
+            if self._waiters[key] == 1 and not starting.done():
+                starting.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                if self._starting.get(key) is starting:
+                    del self._starting[key]
+
+    async def _spawn(self, key: str, command: list[str], env_vars: dict | None, speculative: bool = False) -> PooledServer:
+        server = PooledServer(key, command, env_vars)
+        server.speculative = speculative
+        await server.start()
+
+        try:
+            async with self._lock:
+                self.servers[key] = server
+                evicted = self._evict_over_capacity()
+        except asyncio.CancelledError:
+            await server.close()
+            raise
+        for old in evicted:
+            SERVER_EVICTIONS.inc(reason="capacity")
+            await old.close()
+        return server
+
+    def _evict_over_capacity(self) -> list[PooledServer]:
+        """
+        Pop least recently used idle servers until we are within max_live,
+        unused speculative ones first. Servers still in _starting were just
+        spawned and their callers have not picked them up yet, so they count
+        as busy.
+        """
+        evicted = []
+        keys = list(self.servers)
+        keys.sort(key=lambda key: not self.servers[key].speculative)
+        for key in keys:
+            if len(self.servers) <= self.max_live:
+                break
+            if self.servers[key].in_use == 0 and key not in self._starting:
+                evicted.append(self.servers.pop(key))
+        return evicted
+
+    async def _discard(self, server: PooledServer):
+        async with self._lock:
+            if self.servers.get(server.key) is server:
+                del self.servers[server.key]
+        SERVER_EVICTIONS.inc(reason="failed")
+        await server.close()
+
+    def _ensure_reaper(self):
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap())
+
+    async def _reap(self):
+        interval = max(1.0, self.idle_timeout / 4)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            async with self._lock:
+                idle = [
+                    key for key, server in self.servers.items()
+                    if server.in_use == 0 and (now - server.last_used > self.idle_timeout or not server.alive)
+                ]
+                expired = [self.servers.pop(key) for key in idle]
+            for server in expired:
+                print(f"evicting idle server: {' '.join(server.command)}", file=sys.stderr)
+                SERVER_EVICTIONS.inc(reason="idle")
+                await server.close()
+
+    async def close_all(self):
+        if self._reaper:
+            self._reaper.cancel()
+        async with self._lock:
+            servers = list(self.servers.values())
+            self.servers.clear()
+        await asyncio.gather(*(server.close() for server in servers), return_exceptions=True)
+
+
+pool = ServerPool()
+gauge("mcp_live_servers", "Live pooled MCP server subprocesses", fn=lambda: len(pool.servers))
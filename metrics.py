@@ -0,0 +1,208 @@
+"""
+Latency and counter instrumentation for the search server and the MCP server.
+
+Histograms, counters and gauges live in one process-wide registry and are
+rendered in the Prometheus text format by render(). Setting METRICS=0 turns
+every observation into a no-op; timers then hand back a shared null context,
+so instrumented code pays about one attribute lookup.
+
+    STAGE = histogram("search_stage_seconds", "Time per /search stage", ["stage"])
+    with timer(STAGE, stage="encode"):
+        ...
+"""
+
+from collections import deque
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get("METRICS", "1") != "0"
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _label_key(labelnames: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames: tuple, key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(labelnames, key)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """A value that only goes up, or one read from fn() at scrape time"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        if self.fn is not None:
+            return [(self.name, (), float(self.fn()))]
+        with self._lock:
+            return [(self.name, key, value) for key, value in self.values.items()]
+
+
+class Gauge(Counter):
+    """A settable value, or one read from fn() at scrape time"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self.values[_label_key(self.labelnames, labels)] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += 1
+            series[2] += seconds
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, count, total) in self.series.items():
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    out.append((self.name + "_bucket", key, cumulative, f'le="{bound}"'))
+                out.append((self.name + "_bucket", key, count, 'le="+Inf"'))
+                out.append((self.name + "_count", key, count))
+                out.append((self.name + "_sum", key, total))
+        return out
+
+
+def _register(metric):
+    with _registry_lock:
+        return _registry.setdefault(metric.name, metric)
+
+
+def counter(name: str, help: str, labelnames=(), fn=None) -> Counter:
+    return _register(Counter(name, help, labelnames, fn))
+
+
+def gauge(name: str, help: str, labelnames=(), fn=None) -> Gauge:
+    return _register(Gauge(name, help, labelnames, fn))
+
+
+def histogram(name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labelnames, buckets))
+
+
+class _Timer:
+    __slots__ = ("metric", "labels", "start")
+
+    def __init__(self, metric, labels):
+        self.metric = metric
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metric.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(metric, **labels):
+    """Context manager observing its duration into a Histogram or LatencyWindow"""
+    if not METRICS_ENABLED:
+        return _NULL_TIMER
+    return _Timer(metric, labels)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for sample in metric.samples():
+            name, key, value = sample[:3]
+            extra = sample[3] if len(sample) > 3 else ""
+            lines.append(f"{name}{_format_labels(metric.labelnames, key, extra)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class LatencyWindow:
+    """Rolling window of the most recent latency samples, in seconds"""
+
+    def __init__(self, size: int = 2048):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def percentile(self, p: float) -> float:
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3)
+        }
+
+    def time(self):
+        return _Timer(self, {})
@@ -0,0 +1,63 @@
+"""
+Dynamic micro-batching for request handlers.
+
+Concurrent callers submit single items; a worker thread collects everything
+that arrives within a short window (or until max_batch items are waiting)
+and runs them through one batched call, then hands each caller its result.
+"""
+
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+
+class MicroBatcher:
+    def __init__(self, fn, window_ms: float = 5, max_batch: int = 32):
+        """fn maps a list of items to a list of results in the same order"""
+        self.fn = fn
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.batches = 0
+        self.items = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, item, timeout: float | None = None):
+        future = Future()
+        self._queue.put((item, future))
+        return future.result(timeout)
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            items = [item for item, _ in batch]
+            try:
+                results = self.fn(items)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+            self.batches += 1
+            self.items += len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0
+        }
@@ -0,0 +1,132 @@
+"""
+Staged ingestion pipeline pieces.
+
+    paths --[reader pool]--> bounded queue --[encoder]--> bounded queue --[writer]--> store
+
+Readers (file I/O, encoding detection, filtering) run in a thread pool and the
+writer drains into the store on its own thread, so the encoder - the only
+expensive stage - never waits on either. Every stage keeps throughput stats.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import chardet
+import codecs
+import os
+import queue
+import sys
+import threading
+import time
+
+READ_WORKERS = int(os.environ.get("INGEST_READERS", 8))
+QUEUE_DEPTH = int(os.environ.get("INGEST_QUEUE_DEPTH", 256))
+DETECT_BYTES = 64 * 1024
+
+_DONE = object()
+
+
+def detect_encoding(file_path):
+    """utf-8 when the head of the file decodes as utf-8, otherwise chardet on the head only"""
+    with open(file_path, 'rb') as f:
+        raw_data = f.read(DETECT_BYTES)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(raw_data, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return chardet.detect(raw_data)['encoding']
+
+
+class StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items: int, seconds: float):
+        with self._lock:
+            self.items += items
+            self.busy += seconds
+
+    def timed(self, items: int = 1):
+        return _Timed(self, items)
+
+    def report(self, wall: float) -> str:
+        rate = self.items / wall if wall > 0 else 0.0
+        return f"{self.name} {self.items} ({rate:.1f}/s, busy {100 * self.busy / wall if wall > 0 else 0:.0f}%)"
+
+
+class _Timed:
+    def __init__(self, stats: StageStats, items: int):
+        self.stats = stats
+        self.items = items
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add(self.items, time.perf_counter() - self.start)
+
+
+def read_ahead(fn, items, stats: StageStats, workers: int = READ_WORKERS, depth: int = QUEUE_DEPTH):
+    """
+    Yield fn(item) for every item, computed by a pool of worker threads that
+    run up to depth results ahead of the consumer. None results are dropped
+    and order is not preserved.
+    """
+    out = queue.Queue(maxsize=depth)
+
+    def work(item):
+        try:
+            with stats.timed():
+                result = fn(item)
+        except Exception as e:
+            print(f"{item} => {e}", file=sys.stderr)
+            result = None
+        if result is not None:
+            out.put(result)
+
+    def feed():
+        # A semaphore keeps the pool from buffering the whole input
+        slots = threading.Semaphore(depth)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for item in items:
+                slots.acquire()
+                pool.submit(work, item).add_done_callback(lambda _: slots.release())
+        out.put(_DONE)
+
+    threading.Thread(target=feed, daemon=True).start()
+    while True:
+        result = out.get()
+        if result is _DONE:
+            return
+        yield result
+
+
+class Writer:
+    """Runs store writes on one background thread, in submission order"""
+
+    def __init__(self, stats: StageStats, depth: int = 8):
+        self.stats = stats
+        self._queue = queue.Queue(maxsize=depth)
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, items: int, fn, *args):
+        self._queue.put((items, fn, args))
+
+    def _loop(self):
+        while True:
+            job = self._queue.get()
+            if job is _DONE:
+                return
+            items, fn, args = job
+            try:
+                with self.stats.timed(items):
+                    fn(*args)
+            except Exception as e:
+                print(f"write failed: {e}", file=sys.stderr)
+
+    def close(self):
+        self._queue.put(_DONE)
+        self._thread.join()
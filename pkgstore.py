@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Local store of installed one_liner packages.
+
+`npx pkg` and `uvx pkg` resolve the package against the registry, and often
+download it, on every launch, which dominates a server's cold start. Here
+each package is installed once into its own directory, keyed by a hash of
+the package spec and registry, and later launches exec the installed entry
+point directly:
+
+    npx -y @scope/server@1.2.0 --flag   ->  <store>/npm/<hash>/node_modules/.bin/server --flag
+    uvx server==0.3.1 --flag            ->  <store>/pypi/<hash>/venv/bin/python .../venv/bin/server --flag
+
+Install the whole index ahead of time with
+
+    ./pkgstore.py prefill [gh] [--jobs 4]
+
+INFINITEMCP_PKGSTORE_MODE is "auto" (install on first launch), "prefilled"
+(only use what is already installed) or "off". With INFINITEMCP_OFFLINE=1
+nothing is installed, and commands missing from the store run with npm/uv
+in offline mode. A package that failed to install runs through npx/uvx,
+without another attempt, for INFINITEMCP_INSTALL_RETRY seconds.
+INFINITEMCP_NPM_REGISTRY and INFINITEMCP_PYPI_INDEX point installs at
+another registry, such as bench/fake_registry.py.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from metrics import counter, histogram, timer
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PKGSTORE_PATH = os.environ.get(
+    "INFINITEMCP_PKGSTORE",
+    str(Path.home() / ".cache" / "infinitemcp" / "pkgs")
+)
+PKGSTORE_MODE = os.environ.get("INFINITEMCP_PKGSTORE_MODE", "auto")  # auto, prefilled or off
+OFFLINE = os.environ.get("INFINITEMCP_OFFLINE", "0") == "1"
+NPM_REGISTRY = os.environ.get("INFINITEMCP_NPM_REGISTRY")
+PYPI_INDEX = os.environ.get("INFINITEMCP_PYPI_INDEX")
+INSTALL_TIMEOUT = float(os.environ.get("INFINITEMCP_INSTALL_TIMEOUT", 300))
+INSTALL_RETRY = float(os.environ.get("INFINITEMCP_INSTALL_RETRY", 3600))
+
+# npx / uvx options that take a value
+NPX_VALUE_FLAGS = {"-p", "--package", "-c", "--call"}
+UVX_VALUE_FLAGS = {"--from", "--with", "--python", "-p", "--index-url", "--extra-index-url", "--index"}
+
+LAUNCHES = counter("pkgstore_launches_total", "Server launches, by how the command was resolved", ["how"])
+INSTALL_SECONDS = histogram("pkgstore_install_seconds", "Time to install a package into the store", ["runner"])
+
+
+@dataclass
+class Spec:
+    """What a one_liner runs: a package, the executable it provides, and its arguments"""
+    runner: str  # "npm" or "pypi"
+    package: str
+    bin: str | None
+    args: list[str]
+    extras: list[str] = field(default_factory=list)
+
+    @property
+    def registry(self) -> str | None:
+        return NPM_REGISTRY if self.runner == "npm" else PYPI_INDEX
+
+    @property
+    def key(self) -> str:
+        ident = json.dumps([self.runner, self.package, sorted(self.extras), self.registry])
+        return hashlib.sha256(ident.encode()).hexdigest()[:20]
+
+
+def npm_name(spec: str) -> str:
+    """@scope/pkg@1.2.3 -> @scope/pkg"""
+    match = re.match(r"^(@?[^@]+)(@.*)?$", spec)
+    return match.group(1) if match else spec
+
+
+def pypi_name(spec: str) -> str:
+    """pkg[extra]==1.2.3 or pkg@1.2.3 -> pkg"""
+    return re.split(r"[\[=<>~!@; ]", spec, maxsplit=1)[0]
+
+
+def pip_requirement(spec: str) -> str:
+    """uvx's pkg@1.2.3 as pip's pkg==1.2.3 (pkg@latest as pkg); a PEP 508 "pkg @ url" is left alone"""
+    match = re.match(r"^([A-Za-z0-9][A-Za-z0-9._-]*(?:\[[^\]]*\])?)@([^\s/:@]+)$", spec)
+    if not match:
+        return spec
+    name, version = match.groups()
+    return name if version == "latest" else f"{name}=={version}"
+
+
+def parse(command: list[str]) -> Spec | None:
+    """The Spec behind an npx or uvx one_liner, or None for anything else"""
+    if not command:
+        return None
+    runner = os.path.basename(command[0])
+    if runner not in ("npx", "uvx"):
+        return None
+    value_flags = NPX_VALUE_FLAGS if runner == "npx" else UVX_VALUE_FLAGS
+
+    options, target, args = {}, None, []
+    rest = command[1:]
+    i = 0
+    while i < len(rest):
+        arg = rest[i]
+        if target is not None:
+            args = rest[i:]
+            break
+        if arg.startswith("-"):
+            name, eq, value = arg.partition("=")
+            if name in value_flags:
+                if not eq:
+                    i += 1
+                    value = rest[i] if i < len(rest) else ""
+                options.setdefault(name, []).append(value)
+            i += 1
+            continue
+        target = arg
+        i += 1
+
+    if runner == "npx":
+        if "-c" in options or "--call" in options:
+            return None
+        packages = options.get("-p", []) + options.get("--package", [])
+        if len(packages) > 1 or (not packages and target is None):
+            return None
+        if packages:
+            return Spec("npm", packages[0], target, args)
+        return Spec("npm", target, None, args)
+
+    if target is None:
+        return None
+    if "--index-url" in options or "--extra-index-url" in options or "--index" in options or "--python" in options or "-p" in options:
+        return None  # leave unusual uvx invocations to uvx itself
+    package = options["--from"][0] if "--from" in options else target
+    return Spec("pypi", pip_requirement(package), pypi_name(target), args, extras=options.get("--with", []))
+
+
+def _run(cmd: list[str], cwd: str | None = None):
+    proc = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, timeout=INSTALL_TIMEOUT)
+    if proc.returncode != 0:
+        tail = (proc.stderr or proc.stdout).strip().splitlines()[-3:]
+        raise RuntimeError(f"{' '.join(cmd[:3])} failed: {' | '.join(tail)}")
+
+
+def _npm_entry(root: Path, spec: Spec) -> list[str]:
+    name = npm_name(spec.package)
+    bins = json.loads((root / "node_modules" / name / "package.json").read_text()).get("bin") or {}
+    short = name.split("/")[-1]
+    if isinstance(bins, str):
+        bins = {short: bins}
+    if spec.bin:
+        chosen = spec.bin
+    elif len(bins) == 1:
+        chosen = next(iter(bins))
+    elif short in bins:
+        chosen = short
+    else:
+        raise RuntimeError(f"{name} has no single executable to run ({', '.join(bins) or 'none'})")
+    entry = root / "node_modules" / ".bin" / chosen
+    if not entry.exists():
+        raise RuntimeError(f"{name} did not install {chosen}")
+    return [str(entry)]
+
+
+def _install_npm(root: Path, spec: Spec) -> list[str]:
+    (root / "package.json").write_text("{}")
+    cmd = ["npm", "install", "--no-audit", "--no-fund", "--omit=dev", "--prefix", str(root), spec.package]
+    if NPM_REGISTRY:
+        cmd += ["--registry", NPM_REGISTRY]
+    _run(cmd)
+    return _npm_entry(root, spec)
+
+
+def _install_pypi(root: Path, spec: Spec) -> list[str]:
+    venv = root / "venv"
+    packages = [spec.package, *spec.extras]
+    index = ["--index-url", PYPI_INDEX] if PYPI_INDEX else []
+    if shutil.which("uv"):
+        _run(["uv", "venv", "--quiet", str(venv)])
+        _run(["uv", "pip", "install", "--quiet", "--python", str(venv / "bin" / "python"), *index, *packages])
+    else:
+        _run([sys.executable, "-m", "venv", str(venv)])
+        _run([str(venv / "bin" / "pip"), "install", "--quiet", "--disable-pip-version-check", *index, *packages])
+    entry = venv / "bin" / spec.bin
+    if not entry.exists():
+        raise RuntimeError(f"{spec.package} did not install {spec.bin}")
+    # Through the venv's python: the script's shebang names the scratch path
+    return [str(venv / "bin" / "python"), str(entry)]
+
+
+class PackageStore:
+    def __init__(self, path: str = PKGSTORE_PATH):
+        self.path = Path(path)
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _dir(self, spec: Spec) -> Path:
+        return self.path / spec.runner / spec.key
+
+    def installed(self, spec: Spec) -> list[str] | None:
+        """The entry point command of an installed spec, or None"""
+        try:
+            manifest = json.loads((self._dir(spec) / "manifest.json").read_text())
+        except (OSError, ValueError):
+            return None
+        entry = manifest["entry"]
+        return entry if all(Path(part).exists() for part in entry) else None
+
+    def failed(self, spec: Spec) -> bool:
+        """Whether installing spec failed within the last INSTALL_RETRY seconds"""
+        try:
+            marker = json.loads((self._dir(spec) / "failed.json").read_text())
+        except (OSError, ValueError):
+            return False
+        return time.time() - marker.get("failed_at", 0) < INSTALL_RETRY
+
+    def _mark_failed(self, spec: Spec, error: Exception):
+        final = self._dir(spec)
+        final.mkdir(parents=True, exist_ok=True)
+        (final / "failed.json").write_text(json.dumps({
+            "package": spec.package,
+            "error": str(error),
+            "failed_at": time.time()
+        }))
+
+    def install(self, spec: Spec, refresh: bool = False) -> list[str]:
+        """
+        Install spec unless it already is, and return its entry point command.
+        Installs go to a scratch directory that is renamed into place, so
+        readers never see half an install and racing processes are harmless.
+        A failure leaves a failed.json marker that launch() honours for
+        INSTALL_RETRY seconds; a later successful install replaces it.
+        """
+        with self._locks_lock:
+            lock = self._locks.setdefault(spec.key, threading.Lock())
+        with lock:
+            if not refresh and (entry := self.installed(spec)):
+                return entry
+            final = self._dir(spec)
+            final.parent.mkdir(parents=True, exist_ok=True)
+            scratch = Path(tempfile.mkdtemp(prefix=f".{spec.key}-", dir=final.parent))
+            try:
+                # Entry paths must point into the final directory, so install
+                # at the final path's name inside scratch and move the whole tree
+                work = scratch / spec.key
+                work.mkdir()
+                try:
+                    with timer(INSTALL_SECONDS, runner=spec.runner):
+                        entry = (_install_npm if spec.runner == "npm" else _install_pypi)(work, spec)
+                except Exception as e:
+                    self._mark_failed(spec, e)
+                    raise
+                entry = [str(final / Path(part).relative_to(work)) for part in entry]
+                (work / "manifest.json").write_text(json.dumps({
+                    "package": spec.package,
+                    "runner": spec.runner,
+                    "registry": spec.registry,
+                    "entry": entry,
+                    "installed_at": time.time()
+                }))
+                if final.exists():
+                    shutil.rmtree(final)
+                work.rename(final)
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+            return entry
+
+    def launch(self, command: list[str]) -> tuple[list[str], dict]:
+        """
+        (command, extra env) to actually spawn for a one_liner. Anything the
+        store can't handle comes back unchanged, so callers can always use it.
+        """
+        spec = parse(command) if PKGSTORE_MODE != "off" else None
+        if spec is None:
+            return command, {}
+
+        entry = self.installed(spec)
+        if entry:
+            LAUNCHES.inc(how="store")
+            return entry + spec.args, {}
+        if OFFLINE:
+            LAUNCHES.inc(how="offline")
+            return command, {"npm_config_offline": "true", "UV_OFFLINE": "1"}
+        if PKGSTORE_MODE == "auto" and self.failed(spec):
+            LAUNCHES.inc(how="failed_recently")
+            return command, {}
+        if PKGSTORE_MODE == "auto":
+            try:
+                entry = self.install(spec)
+                LAUNCHES.inc(how="installed")
+                return entry + spec.args, {}
+            except Exception as e:
+                print(f"pkgstore: installing {spec.package} failed, using {command[0]}: {e}", file=sys.stderr)
+        LAUNCHES.inc(how="runner")
+        return command, {}
+
+
+store = PackageStore()
+
+
+def prefill(root: str = "gh", jobs: int = 4, refresh: bool = False):
+    from concurrent.futures import ThreadPoolExecutor
+    from tool_cache import index_one_liners
+
+    specs = {}
+    for command in index_one_liners(root):
+        spec = parse(command)
+        if spec and (refresh or not store.installed(spec)):
+            specs.setdefault(spec.key, spec)
+    print(f"{len(specs)} packages to install", file=sys.stderr)
+
+    def fill(spec):
+        start = time.perf_counter()
+        try:
+            entry = store.install(spec, refresh)
+            print(f"ok {time.perf_counter() - start:6.1f}s {spec.package} -> {entry[0]}", file=sys.stderr)
+        except Exception as e:
+            print(f"fail {spec.package} => {e}", file=sys.stderr)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        list(pool.map(fill, specs.values()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Install one_liner packages into the local store")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("prefill", help="install every package in the gh/ index")
+    p.add_argument("root", nargs="?", default="gh")
+    p.add_argument("--jobs", type=int, default=4)
+    p.add_argument("--refresh", action="store_true", help="reinstall packages already in the store")
+    p = sub.add_parser("resolve", help="print the command a one_liner would launch")
+    p.add_argument("one_liner", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    if args.cmd == "prefill":
+        prefill(args.root, args.jobs, args.refresh)
+    else:
+        command = args.one_liner[1:] if args.one_liner[:1] == ["--"] else args.one_liner
+        print(json.dumps(store.launch(command)))
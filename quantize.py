@@ -0,0 +1,100 @@
+"""
+Compressed first-pass vectors for the local index.
+
+Embeddings can be Matryoshka-truncated to their leading dims and/or
+quantized to int8 (per-dimension symmetric scales) or binary (sign bits).
+The compressed matrix is scanned for candidates, and the candidates are
+rescored exactly against the full-precision rows. Codes stay compact in
+RAM and are up-cast a block at a time while scanning.
+"""
+
+import numpy as np
+
+QUANTIZATIONS = ("none", "int8", "binary")
+
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    return x / np.maximum(np.linalg.norm(x, axis=-1, keepdims=True), 1e-12)
+
+
+def truncate(x: np.ndarray, dims: int | None) -> np.ndarray:
+    """Leading dims of each vector, re-normalized"""
+    if not dims or dims >= x.shape[-1]:
+        return normalize(x)
+    return normalize(x[..., :dims])
+
+
+def quantize(x: np.ndarray, method: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """(codes, scales) of unit vectors x; scales is None except for int8"""
+    if method == "int8":
+        scales = np.maximum(np.abs(x).max(axis=0), 1e-12) / 127.0
+        return np.round(x / scales).astype(np.int8), scales.astype(np.float32)
+    if method == "binary":
+        return np.packbits(x > 0, axis=-1), None
+    return x.astype(np.float16), None
+
+
+# Small enough that the float32 copy of a block stays in cache
+BLOCK_ROWS = 256
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """Set bits per row of a uint64 matrix"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[words.view(np.uint8)].sum(axis=1, dtype=np.int32)
+
+
+def pack_words(bits: np.ndarray) -> np.ndarray:
+    """Packed sign bytes, zero-padded to whole 64-bit words"""
+    bits = np.atleast_2d(bits)
+    pad = -bits.shape[1] % 8
+    if pad:
+        bits = np.pad(bits, ((0, 0), (0, pad)))
+    return np.ascontiguousarray(bits).view(np.uint64)
+
+
+def prepare(codes: np.ndarray, method: str) -> np.ndarray:
+    """
+    The matrix scores() scans, built once at load. int8 and float16 codes are
+    kept as they are, so RAM holds only the compressed bytes; binary codes
+    become 64-bit words for popcount.
+    """
+    if method == "binary":
+        return pack_words(codes)
+    return np.ascontiguousarray(codes)
+
+
+def matvec(matrix: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """matrix @ q, up-casting BLOCK_ROWS rows at a time into one reused float32 buffer"""
+    out = np.empty(len(matrix), dtype=np.float32)
+    buf = np.empty((min(BLOCK_ROWS, len(matrix)), matrix.shape[1]), dtype=np.float32)
+    for start in range(0, len(matrix), BLOCK_ROWS):
+        block = matrix[start:start + BLOCK_ROWS]
+        rows = buf[:len(block)]
+        rows[...] = block
+        np.matmul(rows, q, out=out[start:start + len(block)])
+    return out
+
+
+def scores(matrix: np.ndarray, scales: np.ndarray | None, q: np.ndarray, method: str) -> np.ndarray:
+    """Approximate similarity of every row of prepare()d codes to the (truncated, unit) query q; higher is closer"""
+    if method == "int8":
+        # Dequantize the query instead of the matrix
+        return matvec(matrix, (q * scales).astype(np.float32))
+    if method == "binary":
+        qwords = pack_words(np.packbits(q > 0))[0]
+        out = np.empty(len(matrix), dtype=np.float32)
+        # Row blocks keep the xor temporary in cache; fewer differing sign bits is closer
+        for start in range(0, len(matrix), BLOCK_ROWS):
+            block = matrix[start:start + BLOCK_ROWS]
+            out[start:start + len(block)] = -popcount(block ^ qwords)
+        return out
+    return matvec(matrix, q.astype(np.float32))
+
+
+def nbytes(codes: np.ndarray, scales: np.ndarray | None) -> int:
+    return codes.nbytes + (scales.nbytes if scales is not None else 0)
@@ -4,6 +4,8 @@ from tqdm import tqdm
 from pathlib import Path
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct, SparseVector, SparseVectorParams, FusionQuery
+from qdrant_client.models import SearchParams, QuantizationSearchParams
+from sparse import BM25Encoder
 import common
 import os, json
 import sys
@@ -15,49 +17,48 @@ import signal
 import re
 import spacy
 from sentence_transformers import SentenceTransformer
-from collections import Counter
 import numpy as np
 
-device="cuda"
-model = SentenceTransformer(common.model, trust_remote_code=True, device=device, model_kwargs={ "attn_implementation": "sdpa", 'dtype': torch.bfloat16  })
+model = common.get_model()
 
 # Initialize Qdrant client
 client = QdrantClient(path="./qdrant_db")
 
-def create_sparse_vector(text):
-    """Create a simple BM25-style sparse vector from text"""
-    words = text.lower().split()
-    word_counts = Counter(words)
-    
-    indices = []
-    values = []
-    for word, count in word_counts.items():
-        idx = hash(word) % (2**31)
-        indices.append(idx)
-        values.append(float(count))
-    
-    return SparseVector(indices=indices, values=values)
+bm25 = BM25Encoder("./qdrant_db/bm25.json")
+RESCORE_OVERSAMPLE = 4
 
-# Encode your query
-query_embedding = model.encode("your search query")
-query_sparse = create_sparse_vector("your search query")
+query_text = " ".join(sys.argv[1:]) or "your search query"
+query_embedding = model.encode(query_text)
+indices, values = bm25.encode_query(query_text)
+query_sparse = SparseVector(indices=indices, values=values)
 
-"""
-# Hybrid search
+# Dense candidates come from the compressed first-pass vectors when the
+# collection has them, rescored against the full-precision "dense" vectors
+vectors = client.get_collection("documents").config.params.vectors
+if "dense_small" in vectors:
+    dims = vectors["dense_small"].size
+    dense = Prefetch(
+        prefetch=[Prefetch(query=query_embedding[:dims].tolist(), using="dense_small", limit=20 * RESCORE_OVERSAMPLE)],
+        query=query_embedding.tolist(),
+        using="dense",
+        limit=20
+    )
+else:
+    dense = Prefetch(
+        query=query_embedding.tolist(),
+        using="dense",
+        limit=20,
+        params=SearchParams(quantization=QuantizationSearchParams(rescore=True, oversampling=RESCORE_OVERSAMPLE))
+    )
+
+# Hybrid search: dense and BM25 candidates fused by Reciprocal Rank Fusion
 results = client.query_points(
     collection_name="documents",
     prefetch=[
-        Prefetch(query=query_embedding, using="dense", limit=20),
+        dense,
         Prefetch(query=query_sparse, using="sparse", limit=20)
     ],
-    query=FusionQuery(fusion="rrf"),  # Reciprocal Rank Fusion
-    limit=10
-)
-"""
-results = client.query_points(
-    collection_name="documents",
-    using="dense",
-    query=query_embedding,
+    query=FusionQuery(fusion="rrf"),
     limit=10
 )
 formatted_results = []
@@ -1,68 +1,209 @@
 #!/usr/bin/env python3
-from flask import Flask, request, jsonify
-from qdrant_client import QdrantClient
-from qdrant_client.models import Prefetch, Query, SparseVector
-from sentence_transformers import SentenceTransformer
-from collections import Counter
+from flask import Flask, Response, request, jsonify
+from ranking import rerank, format_results, format_tool_results, RERANK_POOL
+from microbatch import MicroBatcher
+from filters import parse_filters, filters_key, chroma_where
+from metrics import LatencyWindow, counter, histogram, timer, render
+from embedding_cache import EmbeddingCache
 import chromadb
-import torch
 import common
 import json
+import os
 
 app = Flask(__name__)
 client = chromadb.PersistentClient(path="./chroma_db")
 collection = client.get_collection(name="documents")
-model = common.model
+embed_cache = EmbeddingCache(common.MODEL_NAME)
 
-@app.route('/search', methods=['GET'])
-def search():
-    # Get query parameter
+SEARCH_BATCH_WINDOW_MS = float(os.environ.get('SEARCH_BATCH_WINDOW_MS', 5))
+SEARCH_MAX_BATCH = int(os.environ.get('SEARCH_MAX_BATCH', 32))
+
+DEFAULT_LIMIT = 3
+DEFAULT_TOOLS_LIMIT = 5  # what the search_tools MCP tool asks for by default
+MAX_LIMIT = 50
+MAX_BATCH_QUERIES = int(os.environ.get('SEARCH_MAX_BATCH_QUERIES', 256))
+
+SEARCH_STAGE = histogram('search_stage_seconds', 'Time per /search stage', ['stage'])
+SEARCH_REQUESTS = counter('search_requests_total', 'Search requests, by outcome', ['outcome'])
+counter('search_embedding_cache_hits_total', 'Query embeddings served from the cache', fn=lambda: embed_cache.cache.stats()['hits'])
+counter('search_embedding_cache_misses_total', 'Query embeddings that had to be encoded', fn=lambda: embed_cache.cache.stats()['misses'])
+
+def search_many(requests):
+    """
+    Run (query_text, limit, filters) requests, one result list per request.
+    All queries are encoded in one batch; requests sharing filters and a
+    candidate count share one multi-query collection.query.
+    """
+    with timer(SEARCH_STAGE, stage='encode'):
+      query_embeddings = embed_cache.encode(common.get_model(), [r[0] for r in requests])
+    groups = {}
+    for i, (_, limit, filters) in enumerate(requests):
+      groups.setdefault((filters_key(filters), max(RERANK_POOL, limit)), []).append(i)
+
+    out = [None] * len(requests)
+    for (_, n_results), idxs in groups.items():
+      with timer(SEARCH_STAGE, stage='query'):
+        results = collection.query(
+          query_embeddings=query_embeddings[idxs].tolist(),
+          n_results=n_results,
+          where=chroma_where(requests[idxs[0]][2])
+        )
+      with timer(SEARCH_STAGE, stage='rerank'):
+        for j, i in enumerate(idxs):
+          # Rank every candidate and cut after formatting, so hits that can't be
+          # formatted don't eat into the limit
+          out[i] = format_results(rerank(
+            results['ids'][j],
+            results['distances'][j],
+            results['metadatas'][j],
+            limit=n_results
+          ))[:requests[i][1]]
+    return out
+
+# A window of 0 turns micro-batching off and encodes every request on its own
+batcher = MicroBatcher(search_many, SEARCH_BATCH_WINDOW_MS, SEARCH_MAX_BATCH) if SEARCH_BATCH_WINDOW_MS > 0 else None
+search_latency = LatencyWindow()
+
+def search_args(default_limit=DEFAULT_LIMIT):
+    """(query_text, limit, filters) from the query string; ValueError when they are unusable"""
     query_text = request.args.get('q', '').strip()
-    
     if not query_text:
-        return jsonify({"error": "Missing query parameter 'q'"}), 400
+      raise ValueError("Missing query parameter 'q'")
+    limit = min(MAX_LIMIT, max(1, int(request.args.get('limit', default_limit))))
+    return query_text, limit, parse_filters(request.args)
+
+@app.route('/search', methods=['GET'])
+def search():
+    try:
+      query_text, limit, filters = search_args()
+    except ValueError as e:
+      SEARCH_REQUESTS.inc(outcome='bad_request')
+      return jsonify({"error": str(e)}), 400
     
-    query_embedding = model.encode(query_text)
-    query_params = {
-      'query_embeddings': query_embedding.tolist(),
-      'n_results': 30
-    }
-    results = collection.query(**query_params)
-    res = list(zip(
-      results['ids'][0],
-      results['distances'][0],
-      results['metadatas'][0],
-    ))
+    try:
+      with search_latency.time(), timer(SEARCH_STAGE, stage='total'):
+        if batcher:
+          results = batcher.submit((query_text, limit, filters))
+        else:
+          results = search_many([(query_text, limit, filters)])[0]
+    except Exception:
+      SEARCH_REQUESTS.inc(outcome='error')
+      raise
+
+    SEARCH_REQUESTS.inc(outcome='ok')
+    with timer(SEARCH_STAGE, stage='serialize'):
+      return jsonify({ "results": results })
     
-    #import pdb
-    #pdb.set_trace()
-    res1 = []
-    for a in res:
-      print(a[2])
+
+@app.route('/search/batch', methods=['POST'])
+def search_batch():
+    """
+    {"queries": [{"q": ..., "limit": 3, "filters": {...}}, ...]} ->
+    {"responses": [{"results": [...]}, ...]}, one /search response per query, in order
+    """
+    body = request.get_json(silent=True) or {}
+    queries = body.get('queries')
+    if not isinstance(queries, list) or not queries:
+      SEARCH_REQUESTS.inc(outcome='bad_request')
+      return jsonify({"error": "Body must be {\"queries\": [...]}"}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+      SEARCH_REQUESTS.inc(outcome='bad_request')
+      return jsonify({"error": f"At most {MAX_BATCH_QUERIES} queries per batch"}), 400
+
+    requests = []
+    for i, item in enumerate(queries):
       try:
-          mm = json.loads(a[2]['meta'])
-          res1.append([a[0], a[1] - min(mm['stargazerCount'], 500) / 1000, a[2]])
-      except:
-          print(a[2])
-
-    res = sorted(res1, key=lambda x: x[1])
-    res = res[0:3]
-
-    formatted_results = []
-    for doc_id, distance, metadata in res:
-      cand = metadata['oneline']
-      if 'npx' in cand or 'uvx' in cand:
-          res = json.loads(metadata['oneline'])
-          res['name'] = doc_id
-          res['score'] = distance
-          formatted_results.append(res)
-  
-    return jsonify({ "results": formatted_results })
-    
+        if isinstance(item, str):
+          item = {"q": item}
+        query_text = str(item.get('q', '')).strip()
+        if not query_text:
+          raise ValueError("missing 'q'")
+        limit = min(MAX_LIMIT, max(1, int(item.get('limit', DEFAULT_LIMIT))))
+        requests.append((query_text, limit, parse_filters(item.get('filters') or {})))
+      except (AttributeError, TypeError, ValueError) as e:
+        SEARCH_REQUESTS.inc(outcome='bad_request')
+        return jsonify({"error": f"queries[{i}]: {e}"}), 400
+
+    # Already a batch, so it goes straight to search_many instead of the micro-batcher
+    try:
+      with timer(SEARCH_STAGE, stage='batch_total'):
+        results = search_many(requests)
+    except Exception:
+      SEARCH_REQUESTS.inc(outcome='error')
+      raise
+
+    SEARCH_REQUESTS.inc(len(requests), outcome='ok')
+    with timer(SEARCH_STAGE, stage='serialize'):
+      return jsonify({"responses": [{"results": r} for r in results]})
+
+_tools_collection = None
+
+def tools_collection():
+    """The per-tool index built by insert_tools.py, or None when it hasn't been built"""
+    global _tools_collection
+    if _tools_collection is None:
+      try:
+        _tools_collection = client.get_collection(name="tools")
+      except Exception:
+        return None
+    return _tools_collection
+
+@app.route('/search/tools', methods=['GET'])
+def search_tools():
+    """Individual tools matching q, each with its server config and input schema"""
+    try:
+      query_text, limit, filters = search_args(DEFAULT_TOOLS_LIMIT)
+    except ValueError as e:
+      SEARCH_REQUESTS.inc(outcome='bad_request')
+      return jsonify({"error": str(e)}), 400
+
+    tools = tools_collection()
+    if tools is None:
+      return jsonify({"error": "No tool index; run ./insert_tools.py"}), 503
+
+    n_results = max(RERANK_POOL, limit)
+    with timer(SEARCH_STAGE, stage='tools_total'):
+      with timer(SEARCH_STAGE, stage='encode'):
+        query_embedding = embed_cache.encode(common.get_model(), [query_text])
+      with timer(SEARCH_STAGE, stage='query'):
+        results = tools.query(
+          query_embeddings=query_embedding.tolist(),
+          n_results=n_results,
+          where=chroma_where(filters)
+        )
+      with timer(SEARCH_STAGE, stage='rerank'):
+        ranked = format_tool_results(rerank(
+          results['ids'][0],
+          results['distances'][0],
+          results['metadatas'][0],
+          limit=n_results
+        ))[:limit]
+
+    SEARCH_REQUESTS.inc(outcome='ok')
+    with timer(SEARCH_STAGE, stage='serialize'):
+      return jsonify({"results": ranked})
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    return jsonify({
+      "latency": search_latency.summary(),
+      "batching": batcher.stats() if batcher else None,
+      "embedding_cache": embed_cache.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({"status": "ok", "collection": collection_name})
+    return jsonify({
+      "status": "ok",
+      "collection": collection.name,
+      "model": common.MODEL_NAME,
+      "model_loaded": common.model_loaded(),
+      "load_report": common.load_report
+    })
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=os.environ.get('SEARCH_DEBUG', '1') == '1', threaded=True)
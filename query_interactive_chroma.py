@@ -5,14 +5,14 @@ import shlex
 import readline
 import subprocess
 import atexit
-import torch
 import os
-import spacy
 import time
 import common
+from embedding_cache import EmbeddingCache
 
 sys.stdout.write("Starting...\n")
 sys.stdout.flush()
+common.preload()
 
 HISTORY_FILE="history.txt"
 if os.path.exists(HISTORY_FILE):
@@ -32,7 +32,7 @@ def quit():
 
 client = chromadb.PersistentClient(path="./chroma_db")
 collection = client.get_collection(name="documents")
-model = common.model
+embed_cache = EmbeddingCache(common.MODEL_NAME)
 
 start_time=time.time()
 query_last=None
@@ -42,7 +42,7 @@ while True:
     reshow = False
     processed_query = input("🤔 ▶ ").strip()
 
-    query_embedding = model.encode(processed_query)
+    query_embedding = embed_cache.encode(common.get_model(), [processed_query])[0]
 
     query_params = {
       'query_embeddings': query_embedding.tolist(),
@@ -0,0 +1,168 @@
+"""
+Reranking and formatting of vector search hits, shared by the search server
+and the in-process local backend.
+
+Popularity and freshness are numeric metadata columns written at ingest
+(see meta_features), so ranking does no JSON parsing. Each feature has a
+scorer mapping the column arrays of the hits to a bonus in [0, 1]. The final
+score is the vector distance minus the weighted bonuses (lower is better).
+Weights come from RANK_WEIGHTS, a JSON object such as
+'{"stars": 1, "fresh": 0.05, "archived": 0.2}'.
+"""
+
+from datetime import datetime
+import json
+import numpy as np
+import os
+import time
+
+STAR_CAP = 500
+STAR_SCALE = 1000
+FORK_CAP = 100
+FRESH_HALF_LIFE_DAYS = 180
+RERANK_POOL = 30
+
+# stars alone at weight 1 reproduces the original min(stars, 500) / 1000 boost
+DEFAULT_WEIGHTS = {"stars": 1.0, "forks": 0.0, "fresh": 0.0, "archived": 0.0}
+RANK_WEIGHTS = {**DEFAULT_WEIGHTS, **json.loads(os.environ.get("RANK_WEIGHTS", "{}"))}
+
+FEATURES = ("stars", "forks", "pushed_at", "archived")
+
+
+def meta_features(meta: str) -> dict:
+    """Numeric ranking columns from the text of a _meta-info.json (gh repo view output)"""
+    mm = json.loads(meta)
+    pushed_at = 0.0
+    if mm.get('pushedAt'):
+        pushed_at = datetime.fromisoformat(mm['pushedAt'].replace('Z', '+00:00')).timestamp()
+    return {
+        'stars': int(mm['stargazerCount']),
+        'forks': int(mm.get('forkCount') or 0),
+        'pushed_at': pushed_at,
+        'archived': bool(mm.get('archivedAt') or mm.get('isArchived'))
+    }
+
+
+SCORERS = {}
+
+
+def scorer(name: str):
+    """Register fn(columns: dict[str, np.ndarray]) -> np.ndarray as the bonus for a weight name"""
+    def register(fn):
+        SCORERS[name] = fn
+        return fn
+    return register
+
+
+@scorer("stars")
+def _stars(cols):
+    return np.minimum(cols['stars'], STAR_CAP) / STAR_SCALE
+
+
+@scorer("forks")
+def _forks(cols):
+    return np.minimum(cols['forks'], FORK_CAP) / FORK_CAP
+
+
+@scorer("fresh")
+def _fresh(cols):
+    age_days = np.maximum(time.time() - cols['pushed_at'], 0) / 86400
+    return np.where(cols['pushed_at'] > 0, 0.5 ** (age_days / FRESH_HALF_LIFE_DAYS), 0.0)
+
+
+@scorer("archived")
+def _archived(cols):
+    return -cols['archived'].astype(np.float64)
+
+
+def check_weights(weights: dict):
+    """Fail on weights no scorer handles, so a typo in RANK_WEIGHTS stops startup instead of every query"""
+    unknown = sorted(set(weights) - set(SCORERS))
+    if unknown:
+        raise ValueError(f"RANK_WEIGHTS: unknown weight(s) {', '.join(unknown)}; known: {', '.join(sorted(SCORERS))}")
+    for name, weight in weights.items():
+        if not isinstance(weight, (int, float)):
+            raise ValueError(f"RANK_WEIGHTS: {name} must be a number, got {weight!r}")
+
+
+check_weights(RANK_WEIGHTS)
+
+
+def _columns(metadatas: list) -> tuple[dict, np.ndarray]:
+    """
+    Feature columns of the hits, plus a mask of the usable ones. Indexes built
+    before the columns existed fall back to parsing meta, and hits whose meta
+    cannot be parsed are dropped as before.
+    """
+    rows = []
+    keep = []
+    for metadata in metadatas:
+        if 'stars' in metadata:
+            rows.append(metadata)
+            keep.append(True)
+            continue
+        try:
+            rows.append(meta_features(metadata['meta']))
+            keep.append(True)
+        except Exception:
+            rows.append(None)
+            keep.append(False)
+
+    cols = {
+        name: np.array([row[name] if row else 0 for row in rows], dtype=np.float64)
+        for name in FEATURES
+    }
+    return cols, np.array(keep, dtype=bool)
+
+
+def rerank(ids: list, distances: list, metadatas: list, limit: int = 3, weights: dict | None = None) -> list[tuple]:
+    """(id, score, metadata) of the best limit hits by weighted score, best first"""
+    if not ids:
+        return []
+    weights = RANK_WEIGHTS if weights is None else weights
+    cols, keep = _columns(metadatas)
+
+    scores = np.asarray(distances, dtype=np.float64).copy()
+    for name, weight in weights.items():
+        if weight:
+            scores -= weight * SCORERS[name](cols)
+    scores[~keep] = np.inf
+
+    order = np.argsort(scores, kind="stable")[:limit]
+    return [(ids[i], float(scores[i]), metadatas[i]) for i in order if keep[i]]
+
+
+def format_results(ranked: list[tuple]) -> list[dict]:
+    """one_liner configs of the ranked hits that are runnable with npx or uvx"""
+    formatted_results = []
+    for doc_id, distance, metadata in ranked:
+        cand = metadata['oneline']
+        if 'npx' in cand or 'uvx' in cand:
+            try:
+                res = json.loads(cand)
+            except ValueError:
+                continue
+            res['name'] = doc_id
+            res['score'] = float(distance)
+            formatted_results.append(res)
+    return formatted_results
+
+
+def format_tool_results(ranked: list[tuple]) -> list[dict]:
+    """(server config, function name, schema) of ranked hits from the tools collection"""
+    formatted_results = []
+    for doc_id, distance, metadata in ranked:
+        try:
+            config = json.loads(metadata['oneline'])
+            schema = json.loads(metadata['schema'])
+        except (KeyError, ValueError):
+            continue
+        formatted_results.append({
+            'server': metadata['server'],
+            'config': config,
+            'function_name': metadata['tool'],
+            'description': metadata.get('description', ''),
+            'inputSchema': schema,
+            'score': float(distance)
+        })
+    return formatted_results
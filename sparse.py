@@ -0,0 +1,144 @@
+"""
+BM25 sparse vectors for the hybrid qdrant index.
+
+Python's hash() is salted per process, so hashed term indices from ingest
+never matched the ones computed at query time. Terms instead get stable ids
+from a persisted vocabulary, along with their document frequencies:
+
+  documents carry the BM25 term-frequency part, tf*(k1+1) / (tf + k1*(1-b+b*dl/avgdl))
+  queries carry the IDF part, ln(1 + (N - df + 0.5) / (df + 0.5))
+
+so the dot product qdrant computes is the BM25 score, and the IDF stays
+current as the corpus grows without re-encoding stored documents. Counts
+are kept per document id, so re-ingesting a document does not count it twice.
+"""
+
+from pathlib import Path
+import json
+import numpy as np
+import os
+import re
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with you your
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) < 40]
+
+
+class BM25Encoder:
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.vocab: dict[str, int] = {}
+        self.df: list[int] = []
+        self.n_docs = 0
+        self.total_len = 0
+        # doc id -> [length, term ids], so re-ingesting a document replaces its counts
+        self.docs: dict[str, list] = {}
+        self.staged: dict[str, list] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.vocab = state["vocab"]
+            self.df = state["df"]
+            if "docs" in state:
+                self.docs = state["docs"]
+                self.n_docs = state["n_docs"]
+                self.total_len = state["total_len"]
+            else:
+                # Older state counted every ingest again; keep the term ids, recount on the next ingest
+                self.df = [0] * len(self.df)
+
+    def save(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "vocab": self.vocab,
+                "df": self.df,
+                "n_docs": self.n_docs,
+                "total_len": self.total_len,
+                "docs": self.docs
+            }, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def _ids(self, tokens: list[str], grow: bool) -> np.ndarray:
+        ids = []
+        for t in tokens:
+            idx = self.vocab.get(t)
+            if idx is None:
+                if not grow:
+                    continue
+                idx = self.vocab[t] = len(self.df)
+                self.df.append(0)
+            ids.append(idx)
+        return np.asarray(ids, dtype=np.int64)
+
+    def encode_documents(self, docs: list[tuple[str, str]]) -> list[tuple[list[int], list[float]]]:
+        """
+        (indices, values) of (doc id, text) pairs. Their statistics are staged
+        and only counted once commit() is called, after they are stored.
+        Weights for the whole batch are computed in one vectorized pass.
+        """
+        doc_terms = []
+        doc_counts = []
+        lengths = []
+        for doc_id, text in docs:
+            ids = self._ids(tokenize(text), grow=True)
+            terms, counts = np.unique(ids, return_counts=True)
+            doc_terms.append(terms)
+            doc_counts.append(counts)
+            lengths.append(len(ids))
+            self.staged[doc_id] = [len(ids), terms.tolist()]
+
+        # Average length as if the staged documents were committed
+        n_docs, total_len = self.n_docs, self.total_len
+        for doc_id, (length, _) in self.staged.items():
+            old = self.docs.get(doc_id)
+            n_docs += old is None
+            total_len += length - (old[0] if old else 0)
+        avgdl = total_len / n_docs if n_docs else 1.0
+
+        sizes = [len(t) for t in doc_terms]
+        tf = np.concatenate(doc_counts).astype(np.float32) if docs else np.empty(0, np.float32)
+        dl = np.repeat(np.asarray(lengths, dtype=np.float32), sizes)
+        weights = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * dl / max(avgdl, 1.0)))
+
+        out = []
+        start = 0
+        for terms, size in zip(doc_terms, sizes):
+            out.append((terms.tolist(), weights[start:start + size].tolist()))
+            start += size
+        return out
+
+    def commit(self):
+        """Count the staged documents, replacing earlier counts for the same ids"""
+        for doc_id, (length, terms) in self.staged.items():
+            old = self.docs.get(doc_id)
+            if old:
+                self.n_docs -= 1
+                self.total_len -= old[0]
+                for t in old[1]:
+                    self.df[t] -= 1
+            self.docs[doc_id] = [length, terms]
+            self.n_docs += 1
+            self.total_len += length
+            for t in terms:
+                self.df[t] += 1
+        self.staged = {}
+
+    def discard(self):
+        """Forget staged documents that were never stored"""
+        self.staged = {}
+
+    def encode_query(self, text: str) -> tuple[list[int], list[float]]:
+        """IDF-weighted (indices, values) of the known terms in text"""
+        terms = np.unique(self._ids(tokenize(text), grow=False))
+        df = np.asarray([self.df[t] for t in terms], dtype=np.float32)
+        idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5))
+        return terms.tolist(), idf.tolist()
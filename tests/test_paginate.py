@@ -0,0 +1,72 @@
+import asyncio
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from mcp.types import ImageContent, TextContent
+
+import infinite_mcp
+from infinite_mcp import block_size, page_notice, paginate
+
+
+def text(s: str) -> TextContent:
+    return TextContent(type="text", text=s)
+
+
+def image(n: int) -> ImageContent:
+    return ImageContent(type="image", data="A" * n, mimeType="image/png")
+
+
+def test_text_is_cut_at_a_newline_near_the_budget():
+    body = "x" * 95 + "\n" + "y" * 50
+    page, rest = paginate([text(body)], budget=100)
+    assert page[0].text == "x" * 95 + "\n"
+    assert rest[0].text == "y" * 50
+
+
+def test_text_without_a_close_newline_is_cut_at_the_budget():
+    body = "x" * 10 + "\n" + "y" * 200
+    page, rest = paginate([text(body)], budget=100)
+    assert len(page[0].text) == 100
+    assert page[0].text + rest[0].text == body
+
+
+def test_image_that_does_not_fit_starts_the_next_page():
+    blocks = [text("a" * 50), image(30), text("b" * 10)]
+    assert block_size(blocks[1]) > 50
+    page, rest = paginate(blocks, budget=100)
+    assert page == blocks[:1]
+    assert rest == blocks[1:]
+    page, rest = paginate(rest, budget=100)
+    assert page == blocks[1:]
+    assert rest == []
+
+
+def test_image_larger_than_the_budget_gets_a_page_of_its_own():
+    blocks = [image(500), text("after")]
+    page, rest = paginate(blocks, budget=100)
+    assert page == blocks[:1]
+    assert rest == blocks[1:]
+
+
+def test_read_result_returns_the_remainder():
+    body = "".join(f"line {i}\n" for i in range(5000))
+    page, rest = paginate([text(body), image(30)])
+    notice = page_notice(rest)
+    cursor = re.search(r'cursor "([0-9a-f]+)"', notice.text).group(1)
+    assert infinite_mcp.result_pages.get(cursor) == rest
+
+    pages = [page]
+    while True:
+        content = asyncio.run(infinite_mcp.read_result({"cursor": cursor}))
+        match = re.search(r'cursor "([0-9a-f]+)"', content[-1].text) if content[-1].type == "text" else None
+        if match is None:
+            pages.append(content)
+            break
+        pages.append(content[:-1])
+        cursor = match.group(1)
+    blocks = [b for p in pages for b in p]
+    assert "".join(b.text for b in blocks if b.type == "text") == body
+    assert blocks[-1] == image(30)
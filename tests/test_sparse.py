@@ -0,0 +1,71 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sparse import BM25Encoder
+
+DOCS = [
+    ("github/a", "Read and write files on the local filesystem"),
+    ("github/b", "Search the web and fetch pages"),
+    ("github/c", "Query a postgres database with read only access")
+]
+
+
+def stats(encoder: BM25Encoder) -> tuple:
+    return encoder.n_docs, encoder.total_len, list(encoder.df)
+
+
+def ingest(encoder: BM25Encoder, docs: list[tuple[str, str]]):
+    encoder.encode_documents(docs)
+    encoder.commit()
+
+
+def test_reingesting_the_same_ids_does_not_count_them_twice(tmp_path):
+    encoder = BM25Encoder(str(tmp_path / "bm25.json"))
+    ingest(encoder, DOCS)
+    first = stats(encoder)
+    assert first[0] == len(DOCS)
+    ingest(encoder, DOCS)
+    assert stats(encoder) == first
+
+
+def test_changed_document_replaces_its_old_counts(tmp_path):
+    encoder = BM25Encoder(str(tmp_path / "bm25.json"))
+    ingest(encoder, DOCS)
+    ingest(encoder, [("github/b", "Fetch pages")])
+    fresh = BM25Encoder(str(tmp_path / "other.json"))
+    ingest(fresh, [DOCS[0], ("github/b", "Fetch pages"), DOCS[2]])
+    assert encoder.n_docs == fresh.n_docs
+    assert encoder.total_len == fresh.total_len
+    # Term ids differ between the two vocabularies, so compare df by term
+    assert {t: encoder.df[i] for t, i in encoder.vocab.items() if encoder.df[i]} == \
+        {t: fresh.df[i] for t, i in fresh.vocab.items() if fresh.df[i]}
+
+
+def test_save_and_load_keeps_the_statistics(tmp_path):
+    path = str(tmp_path / "bm25.json")
+    encoder = BM25Encoder(path)
+    ingest(encoder, DOCS)
+    encoder.save()
+    loaded = BM25Encoder(path)
+    assert stats(loaded) == stats(encoder)
+    assert loaded.vocab == encoder.vocab
+    # The loaded encoder still knows which ids it has counted
+    ingest(loaded, DOCS)
+    assert stats(loaded) == stats(encoder)
+
+
+def test_discard_leaves_the_statistics_untouched(tmp_path):
+    encoder = BM25Encoder(str(tmp_path / "bm25.json"))
+    ingest(encoder, DOCS)
+    before = stats(encoder)
+    encoder.encode_documents(DOCS + [("github/d", "Send messages to slack channels")])
+    encoder.discard()
+    n_docs, total_len, df = stats(encoder)
+    assert (n_docs, total_len) == before[:2]
+    # New terms get vocabulary ids, but nothing is counted for them
+    assert df[:len(before[2])] == before[2]
+    assert not any(df[len(before[2]):])
+    encoder.commit()
+    assert stats(encoder)[:2] == before[:2]
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tool_view import ToolView
+
+OPT_A = {"type": "object", "properties": {"x": {"type": "string"}}}
+OPT_B = {"type": "object", "properties": {"y": {"type": "integer"}}}
+WRAP = {"type": "object", "properties": {"inner": {"$ref": "#/$defs/Opt"}}}
+
+
+def tool(name: str, opt: dict) -> dict:
+    return {
+        "name": name,
+        "inputSchema": {
+            "type": "object",
+            "properties": {"o": {"$ref": "#/$defs/Opt"}, "w": {"$ref": "#/$defs/Wrap"}},
+            "$defs": {"Opt": opt, "Wrap": WRAP}
+        }
+    }
+
+
+def test_colliding_defs_are_renamed_along_with_refs_to_them():
+    view = ToolView([tool("a", OPT_A), tool("b", OPT_B)])
+    assert view.defs["Opt"] == OPT_A
+    assert view.defs["Opt_2"] == OPT_B
+    assert view.defs["Wrap"] == WRAP
+    # b's Wrap points at b's Opt, so it can't share a's Wrap
+    assert view.defs["Wrap_2"]["properties"]["inner"]["$ref"] == "#/$defs/Opt_2"
+    assert "- b(o?: Opt_2, w?: Wrap_2)" in view.compact()
+
+
+def test_identical_defs_are_shared():
+    view = ToolView([tool("a", OPT_A), tool("b", OPT_A)])
+    assert set(view.defs) == {"Opt", "Wrap"}
+    assert "- b(o?: Opt, w?: Wrap)" in view.compact()
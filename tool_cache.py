@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of tools/list results.
+
+Tool schemas almost never change for a pinned package version, so list_tools
+answers from here without spawning anything. Entries are keyed by the
+normalized one_liner and the package version it pins, compressed in sqlite,
+and considered stale after a TTL. Stale entries are still served while the
+caller revalidates them in the background.
+
+Pre-fill it offline for the whole index with:
+
+    ./tool_cache.py prefill [gh]
+"""
+
+from pathlib import Path
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import zlib
+
+TOOL_CACHE_PATH = os.environ.get(
+    "INFINITEMCP_TOOL_CACHE",
+    str(Path.home() / ".cache" / "infinitemcp" / "tools.sqlite")
+)
+TOOL_CACHE_TTL = float(os.environ.get("INFINITEMCP_TOOL_CACHE_TTL", 7 * 24 * 3600))
+
+
+def normalize_command(command: list[str]) -> list[str]:
+    """Strip whitespace and the npx/uvx yes-flags that don't change what runs"""
+    return [part.strip() for part in command if part.strip() not in ("", "-y", "--yes")]
+
+
+def package_version(command: list[str]) -> str:
+    """
+    The package spec version pinned by a one_liner, or "latest".
+    Handles npx pkg@1.2.3, npx @scope/pkg@1.2.3, uvx pkg==1.2.3 and uvx --from pkg==1.2.3
+    """
+    command = normalize_command(command)
+    if not command:
+        return "latest"
+
+    runner = os.path.basename(command[0])
+    args = command[1:]
+    if runner == "uvx" and "--from" in args:
+        idx = args.index("--from")
+        args = args[idx + 1:idx + 2]
+
+    for arg in args:
+        if arg.startswith("-"):
+            continue
+        if runner == "npx":
+            match = re.match(r"^(@?[^@]+)@(.+)$", arg)
+        else:
+            match = re.match(r"^([^=<>~!]+)==(.+)$", arg)
+        return match.group(2) if match else "latest"
+    return "latest"
+
+
+def cache_key(command: list[str]) -> str:
+    return json.dumps(normalize_command(command)) + "@" + package_version(command)
+
+
+class ToolCache:
+    def __init__(self, path: str = TOOL_CACHE_PATH, ttl: float = TOOL_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS tools (
+                key TEXT PRIMARY KEY,
+                command TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                tools BLOB NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    def get(self, command: list[str]) -> tuple[list[dict], bool] | None:
+        """(tools, fresh) for command, or None when it has never been listed"""
+        row = self.db.execute(
+            "SELECT fetched_at, tools FROM tools WHERE key = ?", (cache_key(command),)
+        ).fetchone()
+        if not row:
+            return None
+        fetched_at, blob = row
+        return json.loads(zlib.decompress(blob)), time.time() - fetched_at < self.ttl
+
+    def version(self, command: list[str]) -> float | None:
+        """When command's tools were last stored, a cheap stamp for caches derived from them"""
+        row = self.db.execute(
+            "SELECT fetched_at FROM tools WHERE key = ?", (cache_key(command),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, command: list[str], tools: list[dict]):
+        blob = zlib.compress(json.dumps(tools, separators=(",", ":")).encode())
+        self.db.execute(
+            "INSERT OR REPLACE INTO tools (key, command, fetched_at, tools) VALUES (?, ?, ?, ?)",
+            (cache_key(command), json.dumps(command), time.time(), blob)
+        )
+        self.db.commit()
+
+    def commands(self) -> list[tuple[list[str], list[dict]]]:
+        """Every cached (command, tools) pair"""
+        return [
+            (json.loads(command), json.loads(zlib.decompress(blob)))
+            for command, blob in self.db.execute("SELECT command, tools FROM tools")
+        ]
+
+
+tool_cache = ToolCache()
+
+
+def index_one_liners(root: str = "gh") -> list[list[str]]:
+    """All usable one_liner commands in the gh/ crawl"""
+    commands = []
+    for path in sorted(Path(root).glob("*/*/_one-liner.json")):
+        try:
+            command = json.loads(path.read_text(errors="replace")).get("one_liner")
+        except Exception:
+            continue
+        if isinstance(command, list) and command and all(isinstance(c, str) for c in command):
+            commands.append(command)
+    return commands
+
+
+async def prefill(root: str = "gh", concurrency: int = 4, timeout: float = 120):
+    from infinite_mcp import fetch_mcp_server_tools
+    from mcp_pool import pool
+
+    sem = asyncio.Semaphore(concurrency)
+    commands = [c for c in index_one_liners(root) if not (tool_cache.get(c) or (None, False))[1]]
+    print(f"{len(commands)} servers to list", file=sys.stderr)
+
+    async def fill(command):
+        async with sem:
+            try:
+                tools = await asyncio.wait_for(fetch_mcp_server_tools(command), timeout)
+                tool_cache.put(command, tools)
+                print(f"ok {len(tools):3d} {' '.join(command)}", file=sys.stderr)
+            except Exception as e:
+                print(f"fail {' '.join(command)} => {e!r}", file=sys.stderr)
+
+    try:
+        await asyncio.gather(*(fill(c) for c in commands))
+    finally:
+        await pool.close_all()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "prefill":
+        print(f"usage: {sys.argv[0]} prefill [gh-dir]", file=sys.stderr)
+        sys.exit(1)
+    asyncio.run(prefill(*sys.argv[2:3]))
@@ -0,0 +1,195 @@
+"""
+Compact rendering of a server's tools for list_tools.
+
+The full listing pretty-prints every inputSchema, which for servers with
+dozens of tools is tens of kilobytes the model rereads on every call. The
+compact form is one signature per tool,
+
+    create_issue(repo: string, title: string, labels?: string[], options?: Options) - Create a new issue
+
+plus each distinct $defs entry printed once, minified, however many tools
+share it. A single tool's full schema is available on demand.
+
+Views are parsed once per (server, tool list version) and kept in a small
+LRU cache, and each rendering is built at most once per view.
+"""
+
+from ttl_cache import TTLCache
+import json
+
+SUMMARY_CHARS = 160
+ENUM_SHOWN = 6
+
+_views = TTLCache(maxsize=128)
+
+
+def minify(schema) -> str:
+    return json.dumps(schema, separators=(",", ":"), ensure_ascii=False)
+
+
+def strip_titles(schema):
+    """Drop the "title" annotations pydantic adds everywhere, but not properties named title"""
+    if isinstance(schema, list):
+        return [strip_titles(s) for s in schema]
+    if not isinstance(schema, dict):
+        return schema
+    out = {}
+    for key, value in schema.items():
+        if key == "title" and isinstance(value, str):
+            continue
+        if key in ("properties", "$defs", "definitions") and isinstance(value, dict):
+            out[key] = {name: strip_titles(v) for name, v in value.items()}
+        else:
+            out[key] = strip_titles(value)
+    return out
+
+
+def rename_refs(schema, renames: dict):
+    """schema with every $ref to a renamed definition pointed at its new name"""
+    if not renames:
+        return schema
+    if isinstance(schema, list):
+        return [rename_refs(s, renames) for s in schema]
+    if not isinstance(schema, dict):
+        return schema
+    out = {}
+    for key, value in schema.items():
+        if key == "$ref" and isinstance(value, str):
+            prefix, _, name = value.rpartition("/")
+            out[key] = f"{prefix}/{renames[name]}" if name in renames and prefix in ("#/$defs", "#/definitions") else value
+        elif key in ("properties", "$defs", "definitions") and isinstance(value, dict):
+            out[key] = {name: rename_refs(v, renames) for name, v in value.items()}
+        else:
+            out[key] = rename_refs(value, renames)
+    return out
+
+
+def type_of(schema, renames: dict | None = None) -> str:
+    """A short TypeScript-ish type for a JSON schema"""
+    if not isinstance(schema, dict):
+        return "any"
+    if "$ref" in schema:
+        name = schema["$ref"].rsplit("/", 1)[-1]
+        return (renames or {}).get(name, name)
+    if "const" in schema:
+        return json.dumps(schema["const"])
+    if "enum" in schema:
+        shown = "|".join(json.dumps(v) for v in schema["enum"][:ENUM_SHOWN])
+        return shown + ("|..." if len(schema["enum"]) > ENUM_SHOWN else "")
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            return "|".join(type_of(s, renames) for s in schema[key])
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        return "|".join(kind)
+    if kind == "array":
+        return type_of(schema.get("items"), renames) + "[]"
+    return kind or "any"
+
+
+def summary(description: str | None) -> str:
+    """First line of a description, cut to SUMMARY_CHARS"""
+    text = (description or "").strip().split("\n", 1)[0].strip()
+    if len(text) > SUMMARY_CHARS:
+        text = text[:SUMMARY_CHARS - 3].rstrip() + "..."
+    return text
+
+
+class ToolView:
+    def __init__(self, tools: list[dict]):
+        self.tools = {tool["name"]: tool for tool in tools if tool.get("name")}
+        self.defs: dict[str, dict] = {}
+        self.lines: list[str] = []
+        self._compact: str | None = None
+        self._full: str | None = None
+
+        for tool in self.tools.values():
+            schema = tool.get("inputSchema") or {}
+            defs = {
+                name: strip_titles(definition)
+                for name, definition in {**schema.get("definitions", {}), **schema.get("$defs", {})}.items()
+            }
+            renames = self.share(defs)
+            for name, definition in defs.items():
+                self.defs[renames.get(name, name)] = rename_refs(definition, renames)
+            self.lines.append(self.signature(tool, renames))
+
+    def share(self, defs: dict) -> dict:
+        """
+        New names for the definitions in defs that clash with a different shared
+        definition of the same name. Renaming one changes the $refs of those that
+        use it, which can make them clash in turn, so repeat until nothing changes.
+        """
+        renames: dict[str, str] = {}
+        for _ in range(len(defs) + 1):
+            found = {}
+            for name, definition in defs.items():
+                definition = rename_refs(definition, renames)
+                shared = name
+                n = 1
+                # Same name, different shape: keep both under distinct names
+                while shared in self.defs and self.defs[shared] != definition:
+                    n += 1
+                    shared = f"{name}_{n}"
+                if shared != name:
+                    found[name] = shared
+            if found == renames:
+                break
+            renames = found
+        return renames
+
+    @staticmethod
+    def signature(tool: dict, renames: dict | None = None) -> str:
+        schema = tool.get("inputSchema") or {}
+        required = set(schema.get("required") or [])
+        params = []
+        for name, prop in (schema.get("properties") or {}).items():
+            param = f"{name}{'' if name in required else '?'}: {type_of(prop, renames)}"
+            if isinstance(prop, dict) and "default" in prop:
+                param += f" = {json.dumps(prop['default'])}"
+            params.append(param)
+        line = f"{tool['name']}({', '.join(params)})"
+        text = summary(tool.get("description"))
+        return f"{line} - {text}" if text else line
+
+    def compact(self) -> str:
+        if self._compact is None:
+            out = "## Functions\n\n" + "\n".join(f"- {line}" for line in self.lines) + "\n"
+            if self.defs:
+                out += "\n## Shared types\n\n"
+                out += "\n".join(f"{name} = {minify(d)}" for name, d in self.defs.items()) + "\n"
+            self._compact = out
+        return self._compact
+
+    def full(self) -> str:
+        if self._full is None:
+            out = "## Available Functions\n\n"
+            for tool in self.tools.values():
+                out += f"### {tool['name']}\n"
+                out += f"{tool.get('description', 'No description')}\n\n"
+                out += f"**Parameters**:\n```json\n{json.dumps(tool.get('inputSchema', {}), indent=2)}\n```\n\n"
+            self._full = out
+        return self._full
+
+    def expand(self, name: str) -> str | None:
+        """One tool's description and complete minified schema, or None if there is no such tool"""
+        tool = self.tools.get(name)
+        if tool is None:
+            return None
+        return (
+            f"## {name}\n\n{tool.get('description') or 'No description'}\n\n"
+            f"**Parameters**:\n```json\n{minify(tool.get('inputSchema', {}))}\n```\n"
+        )
+
+
+def get(key) -> ToolView | None:
+    return _views.get(key)
+
+
+def view(key, tools: list[dict]) -> ToolView:
+    """The cached ToolView for key, which must change whenever tools do"""
+    cached = _views.get(key)
+    if cached is None:
+        cached = ToolView(tools)
+        _views.put(key, cached)
+    return cached